@@ -0,0 +1,220 @@
+"""
+Admission control and load shedding for the detection path.
+
+Work is admitted while fewer than ``max_in_flight`` inferences are running.
+Beyond that, requests wait in a small priority queue. A request is rejected
+early (503 + Retry-After) when the queue is full or when its estimated wait
+already exceeds its deadline, so a surge never accumulates decoded images
+in memory.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Lower rank wins. Live camera frames first, batch jobs last.
+PRIORITY_CLASSES = {
+    "live": 0,
+    "high": 1,
+    "normal": 2,
+    "batch": 3,
+}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController:
+    # Ultralytics predictors are not thread-safe, so one in-flight inference
+    # per process is the default; scale out with more workers instead.
+    def __init__(self, max_in_flight=None, max_queue=None, default_deadline=None):
+        self.max_in_flight = max_in_flight or int(os.getenv("GUARDX_MAX_IN_FLIGHT", 1))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("GUARDX_MAX_QUEUE", 16))
+        self.default_deadline = default_deadline or float(os.getenv("GUARDX_REQUEST_DEADLINE", 15.0))
+
+        self.in_flight = 0
+        self.queued = 0
+        # Last time a slot was taken from idle or released; used for hang detection
+        self.last_progress = time.monotonic()
+        self._waiters = []  # heap of [rank, seq, future, deadline]
+        self._seq = itertools.count()
+
+        # Exponentially weighted service time, seeded conservatively
+        self.service_time = 0.25
+        self._alpha = 0.2
+
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def _rank(self, priority):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        return PRIORITY_CLASSES[priority]
+
+    def estimated_wait(self, priority="normal"):
+        """Estimated seconds a new request of this class would wait for a slot"""
+        rank = self._rank(priority)
+        ahead = sum(1 for w in self._waiters if w[0] <= rank and not w[2].done())
+        if self.in_flight < self.max_in_flight and ahead == 0:
+            return 0.0
+        rounds = (ahead + self.in_flight - self.max_in_flight) // self.max_in_flight + 1
+        return max(rounds, 1) * self.service_time
+
+    def _shed_lowest(self, rank):
+        """Evict the lowest-priority waiter if it ranks below ``rank``"""
+        live = [w for w in self._waiters if not w[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda w: (w[0], w[1]))
+        if worst[0] <= rank:
+            return False
+        worst[2].set_exception(AdmissionRejected("PREEMPTED BY HIGHER PRIORITY WORK", self.service_time))
+        self.queued -= 1
+        self.rejected += 1
+        return True
+
+    def precheck(self, priority="normal", deadline=None):
+        """Reject now if ``acquire`` would shed this request; takes no slot
+
+        Lets callers shed before doing work ahead of ``acquire``, such as
+        receiving an upload. ``acquire`` still makes the final decision.
+        """
+        rank = self._rank(priority)
+        budget = deadline if deadline is not None else self.default_deadline
+        if self.in_flight < self.max_in_flight and self.queued == 0:
+            return
+        wait = self.estimated_wait(priority)
+        if wait > budget:
+            self.rejected += 1
+            raise AdmissionRejected("ESTIMATED QUEUE WAIT EXCEEDS DEADLINE", wait)
+        if self.queued >= self.max_queue and not any(
+            w[0] > rank and not w[2].done() for w in self._waiters
+        ):
+            self.rejected += 1
+            raise AdmissionRejected("DETECTION QUEUE FULL", wait)
+
+    async def acquire(self, priority="normal", deadline=None):
+        """Wait for an inference slot or raise AdmissionRejected"""
+        rank = self._rank(priority)
+        budget = deadline if deadline is not None else self.default_deadline
+        expires_at = time.monotonic() + budget
+
+        if self.in_flight < self.max_in_flight and self.queued == 0:
+            if self.in_flight == 0:
+                self.last_progress = time.monotonic()
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        wait = self.estimated_wait(priority)
+        if wait > budget:
+            self.rejected += 1
+            raise AdmissionRejected("ESTIMATED QUEUE WAIT EXCEEDS DEADLINE", wait)
+
+        if self.queued >= self.max_queue and not self._shed_lowest(rank):
+            self.rejected += 1
+            raise AdmissionRejected("DETECTION QUEUE FULL", wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [rank, next(self._seq), future, expires_at])
+        self.queued += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max(expires_at - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            if future.done() and future.exception() is not None:
+                # Shed or expired by release() just as the deadline fired; already
+                # dequeued and counted there
+                raise future.exception()
+            if future.done():
+                # Slot was handed over just as the deadline fired; give it back
+                self.release()
+            else:
+                future.cancel()
+                self.queued -= 1
+            self.expired += 1
+            raise AdmissionRejected("REQUEST DEADLINE EXCEEDED IN QUEUE", self.service_time)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            elif not future.done():
+                future.cancel()
+                self.queued -= 1
+            raise
+
+        self.admitted += 1
+
+    def release(self, service_time=None):
+        """Free a slot and hand it to the best waiter still within its deadline"""
+        if service_time is not None:
+            self.service_time += self._alpha * (service_time - self.service_time)
+
+        self.in_flight -= 1
+        now = time.monotonic()
+        self.last_progress = now
+        while self._waiters:
+            rank, _, future, expires_at = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.queued -= 1
+            if expires_at <= now:
+                # Queued work past its deadline is dropped, not started
+                future.set_exception(AdmissionRejected("REQUEST DEADLINE EXCEEDED IN QUEUE", self.service_time))
+                self.expired += 1
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+            break
+
+    @asynccontextmanager
+    async def slot(self, priority="normal", deadline=None):
+        """Hold an inference slot for the duration of the block"""
+        await self.acquire(priority, deadline)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def is_stalled(self, timeout):
+        """True if inference is in flight but nothing has finished for ``timeout`` seconds"""
+        return self.in_flight > 0 and time.monotonic() - self.last_progress > timeout
+
+    def get_status(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "service_time": round(self.service_time, 4),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+
+def resolve_priority(requested, current_user):
+    """Map a requested class to one the caller is entitled to"""
+    default = "high" if current_user.get("clearance_level") == "TOP_SECRET" else "normal"
+    if requested in (None, "", "default"):
+        return default
+    if requested == "batch":
+        return "batch"
+    if requested == "high" and default == "high":
+        return "high"
+    return "normal" if requested in PRIORITY_CLASSES else default
+
+
+# Global admission controller shared by HTTP and stream detection
+admission_controller = AdmissionController()
@@ -1,20 +1,40 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse, FileResponse, JSONResponse
 import uvicorn
+import time
+import asyncio
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
+from pydantic import ValidationError
 import io
+import logging
+import uuid
 from PIL import Image
 
 # Import modules
+from logging_config import setup_logging, request_id_var
 from model_wrapper import ModelWrapper
 from auth import (
     authenticate_army_user, create_access_token, get_current_user,
     require_admin_access, require_clearance_level, UserLogin, Token,
-    ACCESS_TOKEN_EXPIRE_MINUTES, initialize_army_auth_system
+    ACCESS_TOKEN_EXPIRE_MINUTES, initialize_army_auth_system, user_from_token
 )
 from camera_detection import router as camera_router
+from admission import admission_controller, AdmissionRejected, resolve_priority
+from metrics import registry, stage, record_stage, request_trace, format_trace
+from responses import (
+    RESPONSE_FORMATS, BOX_ENCODINGS, FastJSONResponse, parse_fields, build_detect_response
+)
+from profiling import PROFILING_ENABLED, MAX_PROFILE_SECONDS, ProfilerBusy, capture_profile
+from evidence import evidence_store, EVIDENCE_ENABLED
+from detection_classes import parse_class_spec, assess_threat
+from resolution import InferenceSpec
+
+setup_logging()
+logger = logging.getLogger("guardx.api")
 
 app = FastAPI(
     title="Guard-X Military Surveillance API",
@@ -22,6 +42,37 @@ app = FastAPI(
     version="2.0.0-MILITARY"
 )
 
+@app.middleware("http")
+async def detect_admission_middleware(request: Request, call_next):
+    """Shed /api/detect before the multipart upload is received and parsed
+
+    Registered before CORS so rejections still carry CORS headers. The
+    handler takes the actual slot after parsing, so a slow upload never
+    holds an inference slot.
+    """
+    if request.method != "POST" or request.url.path != "/api/detect":
+        return await call_next(request)
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user = user_from_token(token) if scheme.lower() == "bearer" else None
+    if user is None:
+        # Unauthenticated requests get their 401/403 from the handler
+        return await call_next(request)
+    try:
+        deadline_ms = int(request.query_params.get("deadline_ms") or 0)
+    except ValueError:
+        return await call_next(request)
+    request_priority = resolve_priority(request.query_params.get("priority"), user)
+    try:
+        admission_controller.precheck(request_priority, deadline_ms / 1000 if deadline_ms else None)
+    except AdmissionRejected as e:
+        logger.warning("⚠️  DETECTION SHED BEFORE UPLOAD", extra={"priority": request_priority, "reason": e.reason})
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"SYSTEM AT CAPACITY - {e.reason}"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return await call_next(request)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +82,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log line and response with a request ID"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Include camera router - FIX THIS
 app.include_router(camera_router, prefix="/camera", tags=["camera"])
 
@@ -38,12 +101,38 @@ app.include_router(camera_router, prefix="/camera", tags=["camera"])
 model_wrapper = ModelWrapper()
 initialize_army_auth_system()
 
+# Queue depths and admission outcomes are read from the controller at scrape time
+registry.callback(
+    "guardx_admission_in_flight", "Inferences currently running",
+    lambda: admission_controller.in_flight
+)
+registry.callback(
+    "guardx_admission_queue_depth", "Detection requests waiting for a slot",
+    lambda: admission_controller.queued
+)
+registry.callback(
+    "guardx_admission_requests_total", "Admission decisions by outcome",
+    lambda: {
+        ("admitted",): admission_controller.admitted,
+        ("rejected",): admission_controller.rejected,
+        ("expired",): admission_controller.expired,
+    },
+    labelnames=["outcome"], type_name="counter"
+)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize military systems on startup"""
-    print("🎖️  GUARD-X MILITARY SYSTEM INITIALIZING...")
+    logger.info("🎖️  GUARD-X MILITARY SYSTEM INITIALIZING...")
     await model_wrapper.load_models()
-    print("✅ GUARD-X SYSTEM OPERATIONAL")
+    if EVIDENCE_ENABLED:
+        await asyncio.to_thread(evidence_store.open)
+    logger.info("✅ GUARD-X SYSTEM OPERATIONAL")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued evidence writes before exit"""
+    await asyncio.to_thread(evidence_store.close)
 
 # MILITARY AUTH ENDPOINTS
 @app.post("/api/auth/login", response_model=Token)
@@ -92,80 +181,140 @@ async def get_current_user_info(current_user = Depends(get_current_user)):
 async def military_threat_detection(
     file: UploadFile = File(...),
     confidence: float = 0.5,
+    priority: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+    trace: bool = False,
+    response_format: str = Query("legacy", alias="format"),
+    fields: Optional[str] = None,
+    box_encoding: str = "nested",
+    classes: Optional[str] = None,
+    quality: Optional[str] = None,
+    latency_budget_ms: Optional[float] = None,
+    refine: bool = False,
     current_user = Depends(require_clearance_level("SECRET"))
 ):
-    """🔒 CLASSIFIED - Military threat detection endpoint"""
+    """🔒 CLASSIFIED - Military threat detection endpoint
+
+    ``format=compact`` returns a short-keyed response; with it, ``fields``
+    selects top-level keys and ``box_encoding`` picks nested, columnar or
+    base64 float32 boxes. The default ``legacy`` shape is unchanged.
+
+    ``classes=person:0.5:1,car:0.6:2`` detects several classes in the same
+    forward pass, each with its own confidence threshold and threat weight.
+
+    ``quality=fast|balanced|high|max`` or ``latency_budget_ms`` picks the
+    inference resolution; ``refine=true`` re-runs low-confidence regions at
+    high resolution.
+    """
+    # Validate file type
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="INVALID FILE TYPE - IMAGE REQUIRED")
+
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"INVALID FORMAT - USE {', '.join(RESPONSE_FORMATS)}")
+    if box_encoding not in BOX_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"INVALID BOX ENCODING - USE {', '.join(BOX_ENCODINGS)}")
     try:
-        print(f"🔄 DETECTION REQUEST from {current_user['username']}")
-        print(f"📁 File: {file.filename}, Type: {file.content_type}")
-        
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="INVALID FILE TYPE - IMAGE REQUIRED")
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"INVALID FIELDS - {e}")
+
+    class_spec = None
+    if classes:
+        try:
+            class_spec = model_wrapper.compile_spec(parse_class_spec(classes, confidence))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"INVALID CLASSES - {e}")
+
+    inference_spec = None
+    if quality is not None or latency_budget_ms is not None or refine:
+        try:
+            inference_spec = InferenceSpec(quality=quality, latency_budget_ms=latency_budget_ms, refine=refine)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            raise HTTPException(status_code=400, detail=f"INVALID INFERENCE POLICY - {field + ': ' if field else ''}{error['msg']}")
+
+    if trace and current_user.get("role") != "ADMIN":
+        raise HTTPException(status_code=403, detail="INSUFFICIENT CLEARANCE - ADMIN ACCESS REQUIRED FOR TRACE")
+
+    # The upload has been parsed by now (detect_admission_middleware sheds
+    # before that); the slot is taken before the image is read or decoded, so
+    # queued requests never hold a decoded frame in memory
+    request_priority = resolve_priority(priority, current_user)
+    deadline = deadline_ms / 1000 if deadline_ms else None
+    queued_at = time.perf_counter()
+    try:
+        with request_trace() if trace else nullcontext() as stages:
+            async with admission_controller.slot(request_priority, deadline):
+                record_stage("detect", "queue_wait", time.perf_counter() - queued_at)
+                return await _run_threat_detection(
+                    file, confidence, current_user, stages,
+                    response_format, selected_fields, box_encoding, class_spec, inference_spec
+                )
+    except AdmissionRejected as e:
+        logger.warning("⚠️  DETECTION SHED", extra={"priority": request_priority, "reason": e.reason})
+        raise HTTPException(
+            status_code=503,
+            detail=f"SYSTEM AT CAPACITY - {e.reason}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def _run_threat_detection(file, confidence, current_user, stages=None,
+                                response_format="legacy", fields=None, box_encoding="nested", class_spec=None,
+                                inference_spec=None):
+    try:
+        logger.debug("🔄 DETECTION REQUEST", extra={
+            "operator": current_user["username"],
+            "upload": file.filename,
+            "content_type": file.content_type
+        })
         
         # Read and process image
-        image_bytes = await file.read()
-        print(f"📊 Image size: {len(image_bytes)} bytes")
+        with stage("detect", "read"):
+            image_bytes = await file.read()
         
-        image = Image.open(io.BytesIO(image_bytes))
-        print(f"🖼️  Image dimensions: {image.width}x{image.height}, Mode: {image.mode}")
+        with stage("detect", "decode"):
+            image = Image.open(io.BytesIO(image_bytes))
+            image.load()
         
         if image.mode != 'RGB':
-            image = image.convert('RGB')
-            print("🔄 Converted image to RGB")
+            with stage("detect", "rgb_convert"):
+                image = image.convert('RGB')
         
         # Run military-grade detection
-        print("🤖 Running AI detection...")
-        detection_result = await model_wrapper.detect_humans(image, confidence)
-        print(f"✅ Detection complete: {detection_result}")
-        
-        # Classify threat level
-        threat_level = "CRITICAL" if detection_result["count"] > 3 else \
-                     "HIGH" if detection_result["count"] > 1 else \
-                     "MEDIUM" if detection_result["count"] > 0 else "LOW"
-        
-        # FIXED: Return both old and new format for compatibility
-        response = {
-            # New military format
-            "classification": "RESTRICTED",
-            "operation_id": f"GUARD-X-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+        detection_result = await model_wrapper.detect_humans(image, confidence, class_spec, inference_spec)
+        logger.info("✅ Detection complete", extra={
             "operator": current_user["username"],
-            "unit": current_user["unit"],
-            "clearance": current_user["clearance_level"],
-            "detection": {
-                "targets_identified": detection_result["count"],
-                "confidence_scores": detection_result["confidences"],
-                "bounding_boxes": detection_result["boxes"],
-                "threat_assessment": threat_level,
-                "model_used": detection_result["model_type"],
-                "processing_time": detection_result["processing_time"],
-                "confidence_threshold": detection_result["confidence_threshold"]
-            },
-            "image_metadata": {
-                "filename": file.filename,
-                "dimensions": f"{image.width}x{image.height}",
-                "format": image.mode
-            },
-            "timestamp": datetime.now().isoformat(),
-            "status": "MISSION_COMPLETE" if detection_result["count"] == 0 else "THREATS_DETECTED",
-            
-            # OLD FORMAT FOR COMPATIBILITY (Frontend expects this)
-            "success": True,
-            "boxes": detection_result["boxes"],
+            "bytes": len(image_bytes),
+            "dimensions": f"{image.width}x{image.height}",
             "count": detection_result["count"],
-            "confidence_scores": detection_result["confidences"],
-            "model_used": detection_result["model_type"],
-            "processing_time": detection_result["processing_time"],
-            "image_size": {
-                "width": image.width,
-                "height": image.height
-            }
-        }
+            "class_counts": detection_result["class_counts"],
+            "imgsz": detection_result["imgsz"],
+            "refined_regions": detection_result["refined_regions"],
+            "processing_time": detection_result["processing_time"]
+        })
+        
+        # Classify threat level from weighted class counts
+        threat_level = assess_threat(detection_result["threat_score"])
+        
+        with stage("detect", "build_response"):
+            response = build_detect_response(
+                response_format, detection_result, threat_level, current_user, image, file.filename,
+                fields, box_encoding
+            )
         
-        return JSONResponse(content=response)
+        if stages is not None:
+            # Serialization of the traced response itself is not included
+            response["trace"] = format_trace(stages)
         
+        with stage("detect", "serialize"):
+            return FastJSONResponse(content=response)
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ MILITARY DETECTION ERROR: {e}")
+        logger.exception(f"❌ MILITARY DETECTION ERROR: {e}")
         raise HTTPException(status_code=500, detail=f"SYSTEM FAILURE: {str(e)}")
 
 # ADMIN ONLY ENDPOINTS
@@ -190,9 +339,92 @@ async def admin_system_status(current_user = Depends(require_admin_access)):
             "active_units": ["CYBER_WARFARE_DIVISION", "SURVEILLANCE_OPERATIONS"]
         },
         "models": health_status.get("models", {}),
+        "admission": admission_controller.get_status(),
+        "evidence": evidence_store.get_status(),
         "security_status": "MAXIMUM"
     }
 
+@app.get("/api/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(
+    seconds: int = 10,
+    mode: str = "python",
+    interval_ms: int = 5,
+    current_user = Depends(require_admin_access)
+):
+    """🎖️ ADMIN ONLY - Sample the live process and return folded stacks for a flamegraph"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="PROFILING DISABLED - SET GUARDX_ENABLE_PROFILING=1")
+    if mode not in ("python", "torch"):
+        raise HTTPException(status_code=400, detail="INVALID MODE - USE python OR torch")
+    if not 1 <= seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"INVALID DURATION - 1 TO {MAX_PROFILE_SECONDS} SECONDS")
+
+    logger.info("🔬 PROFILE CAPTURE STARTED", extra={"admin": current_user["username"], "mode": mode, "seconds": seconds})
+    try:
+        # Capture runs in a worker thread so the server keeps serving the load being profiled
+        folded = await asyncio.to_thread(capture_profile, seconds, mode, max(interval_ms, 1) / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="PROFILE CAPTURE ALREADY RUNNING")
+
+    filename = f"guardx-{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    return PlainTextResponse(folded, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# EVIDENCE ENDPOINTS
+@app.get("/api/evidence")
+async def list_evidence(
+    stream_id: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+    current_user = Depends(require_clearance_level("SECRET"))
+):
+    """Stored evidence frames, newest first; pass next_cursor back as cursor for the next page"""
+    records, next_cursor = await asyncio.to_thread(
+        evidence_store.query, stream_id, since, until, cursor, min(max(limit, 1), 200)
+    )
+    for record in records:
+        record["image_url"] = f"/api/evidence/{record['id']}/image"
+        record["thumbnail_url"] = f"/api/evidence/{record['id']}/thumbnail"
+    return {"evidence": records, "next_cursor": next_cursor}
+
+async def _get_evidence_or_404(evidence_id):
+    record = await asyncio.to_thread(evidence_store.get, evidence_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="EVIDENCE NOT FOUND")
+    return record
+
+@app.get("/api/evidence/{evidence_id}")
+async def get_evidence(evidence_id: int, current_user = Depends(require_clearance_level("SECRET"))):
+    """One evidence record with its detections and linked threat event IDs"""
+    record = await _get_evidence_or_404(evidence_id)
+    record.pop("image_path")
+    record.pop("thumb_path")
+    record["image_url"] = f"/api/evidence/{evidence_id}/image"
+    record["thumbnail_url"] = f"/api/evidence/{evidence_id}/thumbnail"
+    return record
+
+@app.get("/api/evidence/{evidence_id}/image")
+async def get_evidence_image(evidence_id: int, current_user = Depends(require_clearance_level("SECRET"))):
+    """Annotated full frame (JPEG)"""
+    record = await _get_evidence_or_404(evidence_id)
+    if not record["image_path"].exists():
+        raise HTTPException(status_code=404, detail="EVIDENCE FILE MISSING")
+    return FileResponse(record["image_path"], media_type="image/jpeg")
+
+@app.get("/api/evidence/{evidence_id}/thumbnail")
+async def get_evidence_thumbnail(evidence_id: int, current_user = Depends(require_clearance_level("SECRET"))):
+    """Evidence thumbnail (JPEG)"""
+    record = await _get_evidence_or_404(evidence_id)
+    if not record["thumb_path"].exists():
+        raise HTTPException(status_code=404, detail="EVIDENCE FILE MISSING")
+    return FileResponse(record["thumb_path"], media_type="image/jpeg")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Pipeline metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/camera/test")
 async def test_camera():
     """Test camera availability"""
@@ -219,7 +451,7 @@ async def health_check():
     }
 
 if __name__ == "__main__":
-    print("🎖️  STARTING GUARD-X MILITARY SERVER v2.0...")
+    logger.info("🎖️  STARTING GUARD-X MILITARY SERVER v2.0...")
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
 
 
@@ -6,6 +6,9 @@ from datetime import datetime, timedelta
 import os
 from pydantic import BaseModel
 from typing import Optional
+import logging
+
+logger = logging.getLogger("guardx.auth")
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -84,27 +87,19 @@ def authenticate_army_user(username: str, password: str):
                 }
     return False
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current authenticated army user"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="UNAUTHORIZED ACCESS - INVALID MILITARY CREDENTIALS",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+def user_from_token(token: str):
+    """Army user for a bearer token, or None if the token is invalid"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise credentials_exception
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
     
     # Verify user still exists in army system
-    user_found = False
     for user_data in ARMY_USERS.values():
         if user_data["username"] == username:
-            user_found = True
             return {
                 "username": user_data["username"],
                 "email": user_data["email"],
@@ -113,9 +108,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 "clearance_level": user_data["clearance_level"],
                 "unit": user_data["unit"]
             }
-    
-    if not user_found:
-        raise credentials_exception
+    return None
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current authenticated army user"""
+    user = user_from_token(credentials.credentials)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="UNAUTHORIZED ACCESS - INVALID MILITARY CREDENTIALS",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
 def require_admin_access(current_user = Depends(get_current_user)):
     """Require admin level access"""
@@ -126,22 +130,27 @@ def require_admin_access(current_user = Depends(get_current_user)):
         )
     return current_user
 
+CLEARANCE_HIERARCHY = ["PUBLIC", "CONFIDENTIAL", "SECRET", "TOP_SECRET"]
+
+def has_clearance(user, required_level: str):
+    """True if the user's clearance is at or above ``required_level``"""
+    user_clearance = user.get("clearance_level", "")
+    if required_level not in CLEARANCE_HIERARCHY or user_clearance not in CLEARANCE_HIERARCHY:
+        return False
+    return CLEARANCE_HIERARCHY.index(user_clearance) >= CLEARANCE_HIERARCHY.index(required_level)
+
 def require_clearance_level(required_level: str):
     """Require specific clearance level"""
     def check_clearance(current_user = Depends(get_current_user)):
         user_clearance = current_user.get("clearance_level", "")
-        clearance_hierarchy = ["PUBLIC", "CONFIDENTIAL", "SECRET", "TOP_SECRET"]
         
-        if required_level not in clearance_hierarchy or user_clearance not in clearance_hierarchy:
+        if required_level not in CLEARANCE_HIERARCHY or user_clearance not in CLEARANCE_HIERARCHY:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="INVALID CLEARANCE LEVEL"
             )
         
-        required_index = clearance_hierarchy.index(required_level)
-        user_index = clearance_hierarchy.index(user_clearance)
-        
-        if user_index < required_index:
+        if not has_clearance(current_user, required_level):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"INSUFFICIENT CLEARANCE - {required_level} LEVEL REQUIRED"
@@ -152,19 +161,15 @@ def require_clearance_level(required_level: str):
 # Initialize system on startup
 def initialize_army_auth_system():
     """Initialize army authentication system"""
-    print("🔒 INITIALIZING ARMY AUTHENTICATION SYSTEM")
-    print("=" * 50)
-    print("🎖️  CLASSIFIED MILITARY SYSTEM")
-    print("🔐 AUTHORIZED PERSONNEL ONLY")
-    print("=" * 50)
+    logger.info("🔒 INITIALIZING ARMY AUTHENTICATION SYSTEM")
     
     # Log available users (without passwords)
     for user_type, user_data in ARMY_USERS.items():
-        print(f"👤 {user_data['role']}: {user_data['username']}")
-        print(f"   📧 {user_data['email']}")
-        print(f"   🏛️  {user_data['unit']}")
-        print(f"   🔒 Clearance: {user_data['clearance_level']}")
-        print("-" * 30)
+        logger.info(f"👤 {user_data['role']}: {user_data['username']}", extra={
+            "email": user_data["email"],
+            "unit": user_data["unit"],
+            "clearance": user_data["clearance_level"]
+        })
     
-    print("✅ ARMY AUTH SYSTEM OPERATIONAL")
+    logger.info("✅ ARMY AUTH SYSTEM OPERATIONAL")
 
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Guard-X offline batch scanner
+
+Runs person detection over archived imagery without the HTTP server.
+Images are decoded and downscaled by a prefetching thread pool while the
+model runs batched inference on the previous batch. Results are appended
+to JSONL (or Parquet part files) as they are produced, so an interrupted
+scan resumes where it stopped.
+
+Usage (from Backend/):
+    python batch_scan.py /data/sorties --out scans/sorties.jsonl
+    python batch_scan.py "/data/2024-*/**/*.jpg" --format parquet --out scans/2024 \\
+        --batch 16 --decode-workers 8 --threads 8
+    python batch_scan.py /data/sorties --out scans/sorties.jsonl   # again: resumes
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from logging_config import setup_logging, shutdown_logging
+
+logger = logging.getLogger("guardx.batch")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scan image archives for people with YOLO")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories (recursive) or glob patterns")
+    parser.add_argument("--out", required=True, help="JSONL file, or a directory of part files for parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", "yolov8n.pt"))
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=8, help="Images per forward pass")
+    parser.add_argument("--decode-workers", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--prefetch", type=int, default=4, help="Batches decoded ahead of inference")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (default: library default)")
+    parser.add_argument("--part-rows", type=int, default=2000, help="Max rows per parquet part file")
+    parser.add_argument("--flush-seconds", type=float, default=30.0,
+                        help="Write a parquet part at least this often; a crash loses at most this much work")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping scanned images")
+    return parser.parse_args()
+
+
+def iter_images(inputs):
+    """Yield image paths in a stable order without listing whole trees up front"""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        yield os.path.join(root, name)
+        elif glob.has_magic(item):
+            for path in sorted(glob.iglob(item, recursive=True)):
+                if os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+                    yield path
+        else:
+            yield item
+
+
+def decode_image(path, max_side):
+    """Read and downscale in a pool thread; OpenCV releases the GIL for both"""
+    try:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            return path, None, 1.0, (0, 0), "UNREADABLE IMAGE"
+        height, width = image.shape[:2]
+        scale = 1.0
+        # The model letterboxes to imgsz anyway; shrinking here moves that work into the pool
+        if max(height, width) > max_side:
+            scale = max_side / max(height, width)
+            image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        return path, image, scale, (width, height), None
+    except Exception as e:
+        return path, None, 1.0, (0, 0), str(e)
+
+
+def prefetch_batches(paths, pool, batch_size, prefetch, max_side):
+    """Decode ahead with a bounded number of in-flight images, preserving order"""
+    pending = deque()
+    limit = batch_size * max(prefetch, 1)
+    batch = []
+    for path in paths:
+        pending.append(pool.submit(decode_image, path, max_side))
+        if len(pending) >= limit:
+            batch.append(pending.popleft().result())
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    while pending:
+        batch.append(pending.popleft().result())
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class JsonlWriter:
+    def __init__(self, out):
+        self.path = Path(out)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def scanned_paths(self):
+        """Paths already in the output; drops a partial last line left by a crash"""
+        done = set()
+        if not self.path.exists():
+            return done
+        good_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["path"])
+                except (ValueError, KeyError):
+                    break
+                good_bytes += len(line)
+        if good_bytes < self.path.stat().st_size:
+            logger.warning(f"⚠️  Truncating partial record at byte {good_bytes} of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+        return done
+
+    def reset(self):
+        self.path.unlink(missing_ok=True)
+
+    def open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, records):
+        self._file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        # One flush per batch: a crash loses at most the batch in flight
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    def __init__(self, out, part_rows, flush_seconds):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self.pa, self.pq = pa, pq
+        self.dir = Path(out)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.part_rows = part_rows
+        self.flush_seconds = flush_seconds
+        self.schema = pa.schema([
+            ("path", pa.string()),
+            ("width", pa.int32()),
+            ("height", pa.int32()),
+            ("count", pa.int32()),
+            ("boxes", pa.list_(pa.list_(pa.float32(), 4))),
+            ("confidences", pa.list_(pa.float32())),
+            ("error", pa.string()),
+        ])
+        self._rows = []
+        self._last_flush = time.monotonic()
+
+    def _parts(self):
+        return sorted(self.dir.glob("part-*.parquet"))
+
+    def scanned_paths(self):
+        # Parts are renamed into place only when complete, so every part is readable
+        done = set()
+        for part in self._parts():
+            done.update(self.pq.read_table(part, columns=["path"]).column("path").to_pylist())
+        return done
+
+    def reset(self):
+        for part in self._parts():
+            part.unlink()
+
+    def open(self):
+        parts = self._parts()
+        self._next_part = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+
+    def write(self, records):
+        self._rows.extend(records)
+        # Resume only trusts flushed parts, so unflushed rows are bounded by size and age
+        if len(self._rows) >= self.part_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        table = self.pa.Table.from_pylist(self._rows, schema=self.schema)
+        final = self.dir / f"part-{self._next_part:05d}.parquet"
+        tmp = final.with_suffix(".parquet.tmp")
+        self.pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, final)
+        self._next_part += 1
+        self._rows = []
+
+    def close(self):
+        self._flush()
+
+
+def main():
+    args = parse_args()
+    setup_logging(json_output=os.getenv("GUARDX_LOG_FORMAT", "text").lower() == "json")
+
+    if args.threads:
+        os.environ.setdefault("OMP_NUM_THREADS", str(args.threads))
+    from yolo_model import YOLOHumanDetector
+
+    torch = sys.modules.get("torch")
+    if torch is not None and args.threads:
+        torch.set_num_threads(args.threads)
+
+    writer = ParquetWriter(args.out, args.part_rows, args.flush_seconds) if args.format == "parquet" else JsonlWriter(args.out)
+    if args.no_resume:
+        writer.reset()
+        done = set()
+    else:
+        done = writer.scanned_paths()
+        if done:
+            logger.info(f"⏩ Resuming: {len(done)} images already scanned")
+    writer.open()
+
+    detector = YOLOHumanDetector(args.model)
+    logger.info("🛰️  BATCH SCAN STARTED", extra={
+        "model": args.model, "batch": args.batch, "imgsz": args.imgsz,
+        "decode_workers": args.decode_workers, "format": args.format
+    })
+
+    paths = (p for p in iter_images(args.inputs) if p not in done)
+    scanned = detections = errors = 0
+    started = last_report = time.perf_counter()
+    last_scanned = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.decode_workers, thread_name_prefix="guardx-decode") as pool:
+            for batch in prefetch_batches(paths, pool, args.batch, args.prefetch, args.imgsz):
+                decoded = [item for item in batch if item[1] is not None]
+                results = detector.detect_humans_batch(
+                    [item[1] for item in decoded], conf=args.conf, imgsz=args.imgsz
+                ) if decoded else []
+                by_path = {item[0]: result for item, result in zip(decoded, results)}
+
+                records = []
+                for path, image, scale, (width, height), error in batch:
+                    if error is not None:
+                        errors += 1
+                        records.append({"path": path, "width": 0, "height": 0, "count": 0,
+                                        "boxes": [], "confidences": [], "error": error})
+                        continue
+                    # Back to original image pixels
+                    result = by_path[path].rescale(scale)
+                    detections += len(result)
+                    records.append({
+                        "path": path, "width": width, "height": height, "count": len(result),
+                        "boxes": np.round(result.boxes.astype(np.float64), 1).tolist(),
+                        "confidences": np.round(result.scores.astype(np.float64), 4).tolist(),
+                        "error": None,
+                    })
+                writer.write(records)
+                scanned += len(batch)
+
+                now = time.perf_counter()
+                if now - last_report >= args.report_every:
+                    logger.info(f"📊 {scanned} images | {(scanned - last_scanned) / (now - last_report):.1f} img/s | {detections} people", extra={
+                        "scanned": scanned, "detections": detections, "errors": errors,
+                        "mean_images_per_second": round(scanned / (now - started), 2)
+                    })
+                    last_report, last_scanned = now, scanned
+    except KeyboardInterrupt:
+        logger.warning("🛑 Interrupted - rerun the same command to resume")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = scanned / elapsed if elapsed else 0.0
+    logger.info(f"✅ BATCH SCAN COMPLETE: {scanned} images in {elapsed:.1f}s ({rate:.1f} img/s)", extra={
+        "scanned": scanned, "skipped": len(done), "detections": detections, "errors": errors,
+        "seconds": round(elapsed, 1), "images_per_second": round(rate, 2)
+    })
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Synthetic benchmark corpus
+
+Generates a deterministic set of JPEG images and short MJPG videos at
+several resolutions. The scenes are noisy backgrounds with moving
+person-sized blobs, so JPEG sizes and decode costs resemble real footage.
+
+Usage:
+    python benchmarks/corpus.py --out benchmarks/corpus
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    "qvga": (320, 240),
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "fhd": (1920, 1080),
+}
+
+
+def render_scene(width, height, rng, figures, t=0.0):
+    """Textured background with ``figures`` upright blobs, shifted by ``t``"""
+    base = rng.integers(40, 90, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    frame = cv2.resize(base, (width, height), interpolation=cv2.INTER_LINEAR)
+    noise = rng.integers(0, 24, size=frame.shape, dtype=np.uint8)
+    frame = cv2.add(frame, noise)
+
+    fig_h = max(height // 4, 12)
+    fig_w = max(fig_h // 3, 4)
+    for i in range(figures):
+        phase = (i / max(figures, 1) + t * 0.05) % 1.0
+        x = int(phase * (width - fig_w))
+        y = int(height * 0.55 + (i % 3) * height * 0.1) - fig_h // 2
+        y = min(max(y, 0), height - fig_h)
+        color = tuple(int(c) for c in rng.integers(120, 255, size=3))
+        cv2.rectangle(frame, (x, y + fig_h // 5), (x + fig_w, y + fig_h), color, -1)
+        cv2.circle(frame, (x + fig_w // 2, y + fig_h // 10), max(fig_w // 2, 2), color, -1)
+    return frame
+
+
+def generate_images(out_dir, per_resolution=8, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for name, (width, height) in RESOLUTIONS.items():
+        for i in range(per_resolution):
+            frame = render_scene(width, height, rng, figures=i % 6)
+            path = out_dir / "images" / f"{name}_{i:03d}.jpg"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            cv2.imwrite(str(path), frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            paths.append(path)
+    return paths
+
+
+def generate_video(path, width, height, frames=300, fps=30, seed=0):
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    try:
+        for t in range(frames):
+            writer.write(render_scene(width, height, np.random.default_rng(seed), figures=4, t=t))
+    finally:
+        writer.release()
+    return path
+
+
+def build_corpus(out_dir, per_resolution=8, video_frames=300, seed=0):
+    """Create the corpus (idempotent) and return its manifest"""
+    out_dir = Path(out_dir)
+    manifest_path = out_dir / "manifest.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest.get("seed") == seed and manifest.get("per_resolution") == per_resolution:
+            return manifest
+
+    images = generate_images(out_dir, per_resolution, seed)
+    videos = {
+        name: str(generate_video(out_dir / "videos" / f"{name}.avi", w, h, video_frames, seed=seed))
+        for name, (w, h) in RESOLUTIONS.items() if name in ("vga", "hd")
+    }
+    manifest = {
+        "seed": seed,
+        "per_resolution": per_resolution,
+        "images": {name: sorted(str(p) for p in images if p.name.startswith(name + "_")) for name in RESOLUTIONS},
+        "videos": videos,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the Guard-X benchmark corpus")
+    parser.add_argument("--out", default="benchmarks/corpus")
+    parser.add_argument("--per-resolution", type=int, default=8)
+    parser.add_argument("--video-frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = build_corpus(args.out, args.per_resolution, args.video_frames, args.seed)
+    total = sum(len(v) for v in manifest["images"].values())
+    print(f"✅ Corpus ready: {total} images, {len(manifest['videos'])} videos in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
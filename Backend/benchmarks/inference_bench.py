@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Guard-X inference micro-benchmark
+
+Sweeps models x input sizes x batch sizes x intra-/inter-op thread counts x
+backends on a fixed image set. Every configuration runs in a fresh
+process, so thread settings take effect and peak RSS is per configuration.
+
+For each configuration it measures warm per-image latency, throughput, peak
+RSS and detection agreement (IoU-matched F1) against a reference run, then
+writes a JSON + Markdown report and a recommended ``inference_config.json``
+that ModelWrapper loads at startup.
+
+Usage (from Backend/):
+    python benchmarks/inference_bench.py \\
+        --models models/best.pt yolov8n.pt --imgsz 320 480 640 \\
+        --batch 1 4 --intra-threads 2 4 --inter-threads 1 \\
+        --backends torch onnx openvino --out benchmarks/results/inference
+    cp benchmarks/results/inference/inference_config.json .
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from corpus import build_corpus  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Backend name -> ultralytics export format (None runs the .pt directly)
+EXPORT_FORMATS = {
+    "torch": None,
+    "torchscript": "torchscript",
+    "onnx": "onnx",
+    "openvino": "openvino",
+}
+
+
+def export_weights(model_path, backend, imgsz, batch, export_dir):
+    """Export once per (model, backend, imgsz, batch) and cache the result"""
+    fmt = EXPORT_FORMATS[backend]
+    if fmt is None:
+        return model_path
+
+    from ultralytics import YOLO
+
+    target = Path(export_dir) / f"{Path(model_path).stem}_{backend}_{imgsz}_b{batch}"
+    marker = target / "weights.txt"
+    if marker.exists():
+        return marker.read_text().strip()
+
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, batch=batch, verbose=False)
+    target.mkdir(parents=True, exist_ok=True)
+    marker.write_text(str(exported))
+    return str(exported)
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_config(config, image_paths, warmup, iterations, conf):
+    """Benchmark one configuration. Runs inside a freshly spawned process."""
+    import torch
+    torch.set_num_threads(config["intra_op_threads"])
+    torch.set_num_interop_threads(config["inter_op_threads"])
+
+    import cv2
+    from yolo_model import YOLOHumanDetector
+
+    detector = YOLOHumanDetector(config["weights"])
+    images = [cv2.imread(p) for p in image_paths]
+    batch = config["batch"]
+    batches = [images[i:i + batch] for i in range(0, len(images), batch)]
+    batches = [b for b in batches if len(b) == batch] or [images[:batch]]
+    predict = dict(conf=conf, classes=[0], imgsz=config["imgsz"], verbose=False)
+
+    for i in range(warmup):
+        detector.model(batches[i % len(batches)], **predict)
+
+    per_image = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        chunk = batches[i % len(batches)]
+        t0 = time.perf_counter()
+        detector.model(chunk, **predict)
+        per_image.append((time.perf_counter() - t0) / len(chunk))
+    wall = time.perf_counter() - started
+
+    # One untimed pass over every image for the agreement check
+    detections = []
+    for chunk in [images[i:i + batch] for i in range(0, len(images), batch)]:
+        for result in detector.model(chunk, **predict):
+            data = result.boxes.data.cpu().numpy() if result.boxes is not None else []
+            detections.append([[float(v) for v in row[:5]] for row in data])
+
+    per_image.sort()
+    return {
+        "latency_p50_ms": round(per_image[len(per_image) // 2] * 1000, 2),
+        "latency_p95_ms": round(per_image[min(int(len(per_image) * 0.95), len(per_image) - 1)] * 1000, 2),
+        "throughput_ips": round(iterations * batch / wall, 2),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "detections": detections,
+    }
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(ix2 - ix1, 0) * max(iy2 - iy1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def agreement_f1(reference, candidate, iou_threshold=0.5):
+    """F1 of greedy IoU matching between two per-image detection lists"""
+    matched = ref_total = cand_total = 0
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        ref_total += len(ref_boxes)
+        cand_total += len(cand_boxes)
+        unused = list(cand_boxes)
+        for ref in sorted(ref_boxes, key=lambda r: -r[4]):
+            best = max(unused, key=lambda c: box_iou(ref, c), default=None)
+            if best is not None and box_iou(ref, best) >= iou_threshold:
+                matched += 1
+                unused.remove(best)
+    if ref_total == 0 and cand_total == 0:
+        return 1.0
+    precision = matched / cand_total if cand_total else 0.0
+    recall = matched / ref_total if ref_total else 0.0
+    return round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0
+
+
+def benchmark(config, image_paths, args):
+    context = get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_config, config, image_paths, args.warmup, args.iterations, args.conf).result()
+
+
+def recommend(results, min_agreement, latency_budget_ms):
+    """Server config: fastest batch-1 config that agrees with the reference and fits the budget
+
+    The API infers one image per request, so its config is chosen on batch-1
+    latency; larger batches are ranked separately by ``best_per_batch``.
+    """
+    candidates = [
+        r for r in results
+        if "error" not in r and r["batch"] == 1 and r["agreement_f1"] >= min_agreement
+        and (latency_budget_ms is None or r["latency_p95_ms"] <= latency_budget_ms)
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda r: (r["latency_p50_ms"], -r["agreement_f1"]))
+
+
+def best_per_batch(results, min_agreement):
+    """Highest-throughput config per batch size that agrees with the reference (offline scans)"""
+    best = {}
+    for r in results:
+        if "error" in r or r["agreement_f1"] < min_agreement:
+            continue
+        current = best.get(r["batch"])
+        if current is None or r["throughput_ips"] > current["throughput_ips"]:
+            best[r["batch"]] = r
+    return [best[batch] for batch in sorted(best)]
+
+
+def write_markdown(path, results, recommended, by_batch):
+    header = "| model | backend | imgsz | batch | intra | inter | p50 ms | p95 ms | img/s | RSS MB | F1 |"
+    lines = ["# Guard-X inference benchmark", "", header, "|" + "---|" * 11]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['model']} | {r['backend']} | {r['imgsz']} | {r['batch']} | {r['intra_op_threads']} "
+                         f"| {r['inter_op_threads']} | error: {r['error']} | | | | |")
+            continue
+        lines.append(
+            f"| {r['model']} | {r['backend']} | {r['imgsz']} | {r['batch']} | {r['intra_op_threads']} "
+            f"| {r['inter_op_threads']} | {r['latency_p50_ms']} | {r['latency_p95_ms']} | {r['throughput_ips']} "
+            f"| {r['peak_rss_mb']} | {r['agreement_f1']} |"
+        )
+    lines.append("")
+    if recommended:
+        lines.append(f"**Recommended:** {recommended['model']} / {recommended['backend']} @ {recommended['imgsz']}, "
+                     f"{recommended['intra_op_threads']} intra / {recommended['inter_op_threads']} inter threads")
+    else:
+        lines.append("**Recommended:** none met the agreement and latency constraints")
+    if by_batch:
+        lines += ["", "**Best throughput per batch size** (for `batch_scan.py --batch`):", ""]
+        for r in by_batch:
+            lines.append(f"- batch {r['batch']}: {r['model']} / {r['backend']} @ {r['imgsz']}, "
+                         f"{r['intra_op_threads']} intra threads - {r['throughput_ips']} img/s")
+    Path(path).write_text("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep inference settings and recommend a config")
+    parser.add_argument("--models", nargs="+", default=["models/best.pt", "yolov8n.pt"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640])
+    parser.add_argument("--batch", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--intra-threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    parser.add_argument("--inter-threads", nargs="+", type=int, default=[1])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=list(EXPORT_FORMATS))
+    parser.add_argument("--images", help="Directory of images (default: synthetic corpus)")
+    parser.add_argument("--max-images", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--reference", help="Reference as model:imgsz (default: first model, torch, largest imgsz)")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    parser.add_argument("--latency-budget-ms", type=float)
+    parser.add_argument("--out", default=str(BACKEND_DIR / "benchmarks" / "results" / "inference"))
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.images:
+        image_paths = sorted(str(p) for p in Path(args.images).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    else:
+        manifest = build_corpus(BACKEND_DIR / "benchmarks" / "corpus")
+        image_paths = manifest["images"]["vga"] + manifest["images"]["hd"]
+    image_paths = image_paths[:args.max_images]
+
+    models = [m for m in args.models if Path(m).exists() or not m.startswith("models/")]
+    if not models:
+        sys.exit("❌ None of the requested models are available")
+
+    # Reference run: most accurate settings on the plain torch backend
+    ref_model, ref_imgsz = models[0], max(args.imgsz)
+    if args.reference:
+        ref_model, ref_imgsz = args.reference.rsplit(":", 1)
+        ref_imgsz = int(ref_imgsz)
+    print(f"🎯 Reference: {ref_model} @ {ref_imgsz} (torch)")
+    reference = benchmark({
+        "weights": ref_model, "imgsz": ref_imgsz, "batch": 1,
+        "intra_op_threads": max(args.intra_threads), "inter_op_threads": 1,
+    }, image_paths, args)["detections"]
+
+    results = []
+    matrix = itertools.product(models, args.backends, args.imgsz, args.batch, args.intra_threads, args.inter_threads)
+    for model, backend, imgsz, batch, intra, inter in matrix:
+        config = {
+            "model": model, "backend": backend, "imgsz": imgsz, "batch": batch,
+            "intra_op_threads": intra, "inter_op_threads": inter,
+        }
+        label = f"{model} {backend} imgsz={imgsz} batch={batch} threads={intra}/{inter}"
+        try:
+            config["weights"] = export_weights(model, backend, imgsz, batch, out_dir / "exports")
+            measured = benchmark(config, image_paths, args)
+        except Exception as e:
+            print(f"❌ {label}: {e}")
+            results.append({**config, "error": str(e)})
+            continue
+        config["agreement_f1"] = agreement_f1(reference, measured.pop("detections"))
+        config.update(measured)
+        results.append(config)
+        print(f"✅ {label}: p50 {config['latency_p50_ms']} ms, {config['throughput_ips']} img/s, "
+              f"F1 {config['agreement_f1']}")
+
+    recommended = recommend(results, args.min_agreement, args.latency_budget_ms)
+    by_batch = best_per_batch(results, args.min_agreement)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "images": len(image_paths),
+            "reference": {"model": ref_model, "imgsz": ref_imgsz},
+        },
+        "results": results,
+        "recommended": recommended,
+        "best_per_batch": by_batch,
+    }
+    (out_dir / "report.json").write_text(json.dumps(report, indent=2))
+    write_markdown(out_dir / "report.md", results, recommended, by_batch)
+    print(f"\n📄 Report: {out_dir / 'report.md'}")
+
+    if recommended:
+        config = {key: recommended[key] for key in (
+            "model", "backend", "weights", "imgsz", "batch", "intra_op_threads", "inter_op_threads"
+        )}
+        config["measured"] = {key: recommended[key] for key in (
+            "latency_p50_ms", "latency_p95_ms", "throughput_ips", "peak_rss_mb", "agreement_f1"
+        )}
+        (out_dir / "inference_config.json").write_text(json.dumps(config, indent=2))
+        print(f"⚙️  Recommended config: {out_dir / 'inference_config.json'}")
+    else:
+        print("⚠️  No configuration met the agreement/latency constraints")
+
+
+if __name__ == "__main__":
+    main()
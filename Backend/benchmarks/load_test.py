@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Guard-X load-testing harness
+
+Drives /api/detect with concurrent uploads and /camera/ws/camera with many
+concurrent viewers fed from a video file, then reports p50/p95/p99 latency,
+throughput and server memory. Results can be saved as a baseline and later
+runs compared against it; a regression beyond the tolerance exits non-zero
+so the check can gate a deployment.
+
+Typical runs (from Backend/):
+    # Self-contained: spawn the server with the stub model, no torch needed
+    python benchmarks/load_test.py --spawn-server --stub --save-baseline benchmarks/baseline.json
+
+    # Later, compare against the saved baseline
+    python benchmarks/load_test.py --spawn-server --stub --baseline benchmarks/baseline.json
+
+    # Against a running server with the real model
+    python benchmarks/load_test.py --url http://localhost:8000 --server-pid 12345
+
+Requires httpx (pip install -r benchmarks/requirements.txt) and websockets.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from corpus import build_corpus  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Metric name -> direction in which a change is a regression
+REGRESSION_DIRECTIONS = {
+    "p50_ms": "higher",
+    "p95_ms": "higher",
+    "p99_ms": "higher",
+    "throughput_rps": "lower",
+    "fps_per_viewer": "lower",
+    "peak_rss_mb": "higher",
+}
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_latencies(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "mean_ms": round(sum(values) / len(values), 2),
+        "max_ms": round(values[-1], 2),
+    }
+
+
+class RssSampler:
+    """Samples a process's resident set size from /proc while a scenario runs"""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def _read_rss_mb(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+    async def _run(self):
+        while True:
+            rss = self._read_rss_mb()
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task:
+            self._task.cancel()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        return {
+            "peak_rss_mb": round(max(self.samples), 1),
+            "mean_rss_mb": round(sum(self.samples) / len(self.samples), 1),
+        }
+
+
+async def login(client, username, password):
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_http_scenario(client, token, images, concurrency, duration, params, server_pid):
+    """Closed-loop load: ``concurrency`` workers upload back to back for ``duration`` seconds"""
+    payloads = [(Path(p).name, Path(p).read_bytes()) for p in images]
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    statuses = {}
+    stop_at = time.perf_counter() + duration
+
+    async def worker(offset):
+        i = offset
+        while time.perf_counter() < stop_at:
+            name, data = payloads[i % len(payloads)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/detect", params=params, headers=headers,
+                    files={"file": (name, data, "image/jpeg")},
+                )
+                status = response.status_code
+                await response.aread()
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+            elif status == 503:
+                retry_after = response.headers.get("Retry-After")
+                await asyncio.sleep(min(float(retry_after or 1), 1.0))
+
+    started = time.perf_counter()
+    with RssSampler(server_pid) as rss:
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    result = {
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "status_counts": {str(k): v for k, v in statuses.items()},
+        "throughput_rps": round(len(latencies) / wall, 2),
+        **summarize_latencies(latencies),
+        **rss.summary(),
+    }
+    return result
+
+
+async def run_ws_scenario(ws_url, video_path, viewers, duration, server_pid):
+    """One viewer starts a video-file stream; all viewers receive the fan-out"""
+    intervals = []
+    frames = [0] * viewers
+    bytes_received = [0] * viewers
+    started = asyncio.Event()
+
+    async def viewer(index):
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            if index == 0:
+                await ws.send(json.dumps({"type": "start_camera", "camera_id": str(video_path)}))
+            else:
+                await started.wait()
+            last = None
+            stop_at = time.perf_counter() + duration
+            while time.perf_counter() < stop_at:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=max(stop_at - time.perf_counter(), 0.01))
+                except asyncio.TimeoutError:
+                    break
+                message = json.loads(raw)
+                if message.get("type") == "camera_started":
+                    started.set()
+                    continue
+                if message.get("type") == "camera_error":
+                    started.set()
+                    raise RuntimeError(f"Server could not open {video_path}")
+                if message.get("type") != "detection_frame":
+                    continue
+                now = time.perf_counter()
+                if last is not None:
+                    intervals.append(now - last)
+                last = now
+                frames[index] += 1
+                bytes_received[index] += len(raw)
+            if index == 0:
+                await ws.send(json.dumps({"type": "stop_camera"}))
+
+    started_at = time.perf_counter()
+    with RssSampler(server_pid) as rss:
+        await asyncio.gather(*(viewer(i) for i in range(viewers)))
+    wall = time.perf_counter() - started_at
+
+    interval_stats = summarize_latencies(intervals)
+    total_frames = sum(frames)
+    return {
+        "viewers": viewers,
+        "frames_delivered": total_frames,
+        "fps_per_viewer": round(total_frames / viewers / wall, 2) if viewers else 0.0,
+        "throughput_rps": round(total_frames / wall, 2),
+        "mean_frame_kb": round(sum(bytes_received) / total_frames / 1024, 1) if total_frames else None,
+        # Latency percentiles here are frame inter-arrival gaps as seen by viewers
+        **interval_stats,
+        **rss.summary(),
+    }
+
+
+def spawn_server(port, stub, stub_latency_ms, data_dir):
+    env = dict(os.environ)
+    env.setdefault("GUARDX_LOG_LEVEL", "WARNING")
+    # Keep evidence disk I/O out of the numbers and the run's files out of the tree
+    env["GUARDX_EVIDENCE_ENABLED"] = "0"
+    env["GUARDX_EVIDENCE_DIR"] = str(Path(data_dir) / "evidence")
+    env["GUARDX_SORTIE_DIR"] = str(Path(data_dir) / "sorties")
+    if stub:
+        env["GUARDX_STUB_MODEL"] = "1"
+        env["GUARDX_STUB_LATENCY_MS"] = str(stub_latency_ms)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_for_health(client, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get("/api/health")
+            if response.status_code == 200 and response.json().get("models_loaded"):
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not become healthy in time")
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Return (scenario, metric, baseline, current, change) for each regression"""
+    regressions = []
+    for scenario, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        for metric, direction in REGRESSION_DIRECTIONS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (direction == "higher" and change > tolerance) or (direction == "lower" and change < -tolerance):
+                regressions.append((scenario, metric, old, new, change))
+    return regressions
+
+
+def print_report(report):
+    print("\n" + "=" * 70)
+    print("📊 GUARD-X LOAD TEST")
+    print("=" * 70)
+    for name, result in report["scenarios"].items():
+        print(f"\n▶ {name}")
+        for key, value in result.items():
+            print(f"   {key:<18} {value}")
+
+
+async def run(args):
+    manifest = build_corpus(args.corpus)
+    server = None
+    data_dir = None
+    server_pid = args.server_pid
+    base_url = args.url
+
+    if args.spawn_server:
+        base_url = f"http://127.0.0.1:{args.port}"
+        data_dir = tempfile.TemporaryDirectory(prefix="guardx-load-")
+        server = spawn_server(args.port, args.stub, args.stub_latency_ms, data_dir.name)
+        server_pid = server.pid
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "stub_model": bool(args.stub),
+            "duration": args.duration,
+        },
+        "scenarios": {},
+    }
+
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            await wait_for_health(client)
+            token = await login(client, args.username, args.password)
+
+            if "http" in args.scenarios:
+                for resolution in args.resolutions:
+                    for concurrency in args.concurrency:
+                        name = f"http_detect_{resolution}_c{concurrency}"
+                        print(f"🚀 {name}...")
+                        report["scenarios"][name] = await run_http_scenario(
+                            client, token, manifest["images"][resolution], concurrency,
+                            args.duration, {"confidence": 0.5}, server_pid,
+                        )
+
+            if "ws" in args.scenarios:
+                ws_url = base_url.replace("http", "ws", 1) + "/camera/ws/camera"
+                video = Path(manifest["videos"][args.video]).resolve()
+                for viewers in args.viewers:
+                    name = f"ws_camera_{args.video}_v{viewers}"
+                    print(f"🚀 {name}...")
+                    report["scenarios"][name] = await run_ws_scenario(ws_url, video, viewers, args.duration, server_pid)
+                    # Let the server tear the stream down before the next run
+                    await asyncio.sleep(1.0)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+            data_dir.cleanup()
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Guard-X HTTP and WebSocket APIs")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--spawn-server", action="store_true", help="Start a local server for the run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stub", action="store_true", help="Spawned server uses the stub model (no torch)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--server-pid", type=int, help="PID of an external server, for memory sampling")
+    parser.add_argument("--username", default=os.getenv("OPERATOR_USERNAME", "field_operator"))
+    parser.add_argument("--password", default=os.getenv("OPERATOR_PASSWORD", "Field@Ops2024!"))
+    parser.add_argument("--corpus", default=str(BACKEND_DIR / "benchmarks" / "corpus"))
+    parser.add_argument("--scenarios", nargs="+", default=["http", "ws"], choices=["http", "ws"])
+    parser.add_argument("--resolutions", nargs="+", default=["vga", "fhd"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--video", default="vga", choices=["vga", "hd"])
+    parser.add_argument("--viewers", nargs="+", type=int, default=[1, 16])
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per scenario")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline")
+    parser.add_argument("--baseline", help="Compare against this baseline report")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Report written to {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for scenario, metric, old, new, change in regressions:
+                print(f"   {scenario} {metric}: {old} -> {new} ({change:+.1%})")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 import cv2
 import asyncio
 import json
 import base64
 import numpy as np
-from auth import get_current_user
+import logging
+import time
+from typing import Optional
+from pydantic import ValidationError
+from auth import get_current_user, require_clearance_level, user_from_token, has_clearance
 from model_wrapper import ModelWrapper
+from admission import admission_controller, AdmissionRejected
+from logging_config import RateLimitedLogger
+from metrics import stage, stream_label, FpsMeter, STREAM_FRAMES, STREAM_DROPS
+from threat_events import threat_engine, ZoneConfig, GpsLocation
+from detections import Detections
+from detection_classes import DetectionSpec, stream_class_specs
+from resolution import InferenceSpec, stream_inference_specs
+from telemetry import telemetry_store, TelemetryBatch, rows_to_dicts, TRACK_COLUMNS, DETECTION_COLUMNS
+from roi import StreamROI, StreamROIConfig, stream_rois
+from evidence import evidence_store, EVIDENCE_ENABLED
+
+logger = logging.getLogger("guardx.camera")
+# Per-frame messages are throttled so the stream loop never floods stdout
+frame_log = RateLimitedLogger(logger, interval=5.0)
+
+# Live frames are only worth detecting while they are fresh
+LIVE_FRAME_DEADLINE = 0.3
 
 router = APIRouter()
 
@@ -17,116 +38,193 @@ class CameraManager:
         self.camera = None
         self.is_streaming = False
         self.gps_location = None
+        self.dropped_frames = 0
+        self.stream_id = None
         
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
-        print(f"📱 WebSocket connected. Total connections: {len(self.active_connections)}")
+        logger.info(f"📱 WebSocket connected. Total connections: {len(self.active_connections)}")
         
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
-            print(f"📱 WebSocket disconnected. Total connections: {len(self.active_connections)}")
+            logger.info(f"📱 WebSocket disconnected. Total connections: {len(self.active_connections)}")
             
     async def start_camera(self, camera_id=0):
         """Start camera capture"""
         try:
-            print(f"📹 Starting camera {camera_id}...")
+            logger.info(f"📹 Starting camera {camera_id}...")
             self.camera = cv2.VideoCapture(camera_id)
+            self.stream_id = str(camera_id)
             
             if not self.camera.isOpened():
-                print("❌ Camera failed to open")
+                logger.error("❌ Camera failed to open")
                 return False
                 
             self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
             self.camera.set(cv2.CAP_PROP_FPS, 30)
             self.is_streaming = True
-            print("✅ Camera started successfully")
+            telemetry_store.start_sortie(self.stream_id)
+            logger.info("✅ Camera started successfully")
             return True
         except Exception as e:
-            print(f"❌ Camera start failed: {e}")
+            logger.error(f"❌ Camera start failed: {e}")
             return False
             
     async def stop_camera(self):
         """Stop camera capture"""
-        print("🛑 Stopping camera...")
+        logger.info("🛑 Stopping camera...")
         self.is_streaming = False
         if self.camera:
             self.camera.release()
             self.camera = None
-        print("✅ Camera stopped")
+        if self.stream_id is not None:
+            threat_engine.reset_stream(self.stream_id)
+            await asyncio.to_thread(telemetry_store.stop_sortie, self.stream_id)
+        logger.info("✅ Camera stopped")
             
     async def stream_detection(self):
         """Stream camera with real-time detection"""
-        print("🎥 Starting detection stream...")
         frame_count = 0
+        stream_id = self.stream_id
+        # /metrics never sees the raw stream ID; the log line maps the two
+        metric_label = stream_label(stream_id)
+        logger.info("🎥 Starting detection stream...", extra={"metrics_label": metric_label})
+        fps_meter = FpsMeter(metric_label)
+        frames_counter = STREAM_FRAMES.labels(metric_label)
         
         while self.is_streaming and self.camera:
             try:
-                ret, frame = self.camera.read()
+                with stage("stream", "capture"):
+                    ret, frame = self.camera.read()
                 if not ret:
-                    print("❌ Failed to read frame")
+                    logger.error("❌ Failed to read frame")
+                    STREAM_DROPS.labels(metric_label, "read_failed").inc()
                     break
+                captured_at = time.time()
+
+                # Position at capture time from the telemetry feed, else the static start position
+                with stage("stream", "position"):
+                    position = telemetry_store.position_at(stream_id, captured_at) or self.gps_location
                 
                 frame_count += 1
+                frames_counter.inc()
                 
+                events = []
                 # Run detection every 3rd frame for performance
                 if frame_count % 3 == 0:
-                    detection_result = await self.model_wrapper.detect_realtime_frame(frame)
+                    try:
+                        async with admission_controller.slot("live", LIVE_FRAME_DEADLINE):
+                            detection_result = await self.model_wrapper.detect_realtime_frame(
+                                frame, stream_rois.get(stream_id), self._class_spec(stream_id),
+                                stream_inference_specs.get(stream_id)
+                            )
+                        # Only frames that were actually detected feed the event engine
+                        with stage("stream", "events"):
+                            try:
+                                events = threat_engine.process(stream_id, detection_result, captured_at, position)
+                            except Exception as e:
+                                # A bad frame must not end the stream
+                                logger.error(f"❌ Threat event error: {e}", extra={"stream_id": stream_id})
+                        if detection_result["count"]:
+                            telemetry_store.record_detection(
+                                stream_id, captured_at, position, detection_result["count"], detection_result.get("threat_score", 0.0)
+                            )
+                    except AdmissionRejected:
+                        # Shed this frame's detection, keep the video flowing
+                        self.dropped_frames += 1
+                        STREAM_DROPS.labels(metric_label, "shed").inc()
+                        detection_result = {"detections": Detections.empty(), "count": 0}
                 else:
-                    detection_result = {"boxes": [], "count": 0, "confidences": []}
+                    detection_result = {"detections": Detections.empty(), "count": 0}
+                # Same label names on every frame so clients see one message shape
+                class_names = detection_result.get("class_names") or self.model_wrapper.class_names()
                 
                 # Draw bounding boxes
-                annotated_frame = self.draw_detections(frame, detection_result)
+                with stage("stream", "draw"):
+                    annotated_frame = self.draw_detections(frame, detection_result, position, class_names)
                 
                 # Encode frame to base64
-                _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
+                with stage("stream", "encode"):
+                    _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
+
+                if EVIDENCE_ENABLED and detection_result["count"]:
+                    # Hand-off only; hashing and disk writes happen on the evidence pool
+                    with stage("stream", "evidence"):
+                        evidence_store.submit(
+                            stream_id, annotated_frame, buffer, detection_result,
+                            captured_at, position, events
+                        )
                 
                 # Send to all connected clients
                 message = {
                     "type": "detection_frame",
                     "frame": frame_base64,
-                    "detections": detection_result,
+                    "detections": detection_result["detections"].to_json(class_names),
                     "timestamp": asyncio.get_event_loop().time(),
-                    "gps_location": self.gps_location
+                    "gps_location": position
                 }
                 
-                # Send to all connections
+                # Serialize once, then fan out to all connections
+                with stage("stream", "serialize"):
+                    payload = json.dumps(message)
+                
                 disconnected = []
-                for connection in self.active_connections:
-                    try:
-                        await connection.send_text(json.dumps(message))
-                    except Exception as e:
-                        print(f"❌ Failed to send to client: {e}")
-                        disconnected.append(connection)
+                with stage("stream", "send"):
+                    for connection in self.active_connections:
+                        try:
+                            await connection.send_text(payload)
+                        except Exception as e:
+                            frame_log.warning(f"❌ Failed to send to client: {e}")
+                            STREAM_DROPS.labels(metric_label, "send_failed").inc()
+                            disconnected.append(connection)
                 
                 # Remove disconnected clients
                 for conn in disconnected:
                     self.disconnect(conn)
+                
+                fps_meter.tick()
+
+                frame_log.info("🎥 Streaming", extra={
+                    "frames": frame_count,
+                    "clients": len(self.active_connections),
+                    "dropped_frames": self.dropped_frames
+                })
                     
                 await asyncio.sleep(0.1)  # ~10 FPS
                 
             except Exception as e:
-                print(f"❌ Streaming error: {e}")
+                logger.error(f"❌ Streaming error: {e}")
                 break
                 
-        print("🛑 Detection stream ended")
+        logger.info("🛑 Detection stream ended")
                 
-    def draw_detections(self, frame, detection_result):
-        """Draw bounding boxes on frame"""
+    def _class_spec(self, stream_id):
+        spec = stream_class_specs.get(stream_id)
+        # Compiled once per spec and cached by the model wrapper
+        return self.model_wrapper.compile_spec(spec) if spec is not None else None
+
+    def draw_detections(self, frame, detection_result, position=None, names=None):
+        """Draw bounding boxes on frame, labelled by class name"""
+        position = position or self.gps_location
         annotated_frame = frame.copy()
         
-        for i, box in enumerate(detection_result["boxes"]):
-            x1, y1, x2, y2 = map(int, box)
-            confidence = detection_result["confidences"][i] if i < len(detection_result["confidences"]) else 0.0
+        detections = detection_result["detections"]
+        names = names or detection_result.get("class_names") or self.model_wrapper.class_names()
+        for i, (box, confidence, class_id) in enumerate(zip(
+            detections.boxes.astype(int).tolist(), detections.scores.tolist(), detections.classes.tolist()
+        )):
+            x1, y1, x2, y2 = box
             
             # Draw rectangle
             cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
             
             # Draw label
-            label = f"HUMAN {i+1}: {confidence:.2f}"
+            name = names.get(class_id, str(class_id)).upper()
+            label = f"{name} {i+1}: {confidence:.2f}"
             label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
             cv2.rectangle(annotated_frame, (x1, y1-25), (x1+label_size[0], y1), (0, 0, 255), -1)
             cv2.putText(annotated_frame, label, (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
@@ -136,8 +234,10 @@ class CameraManager:
         cv2.putText(annotated_frame, count_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         # Add GPS info if available
-        if self.gps_location:
-            gps_text = f"GPS: {self.gps_location['latitude']:.4f}, {self.gps_location['longitude']:.4f}"
+        if position:
+            gps_text = f"GPS: {position['latitude']:.4f}, {position['longitude']:.4f}"
+            if position.get("source") == "telemetry":
+                gps_text += f"  ALT {position['altitude']:.0f}m  HDG {position['heading']:03.0f}"
             cv2.putText(annotated_frame, gps_text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
         
         return annotated_frame
@@ -155,7 +255,7 @@ def get_camera_manager():
 @router.websocket("/ws/camera")
 async def websocket_camera(websocket: WebSocket):
     """WebSocket endpoint for real-time camera detection"""
-    print("🔌 New WebSocket connection attempt...")
+    logger.info("🔌 New WebSocket connection attempt...")
     manager = get_camera_manager()
     await manager.connect(websocket)
     
@@ -163,7 +263,7 @@ async def websocket_camera(websocket: WebSocket):
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
-            print(f"📨 Received message: {message}")
+            logger.debug("📨 Received message", extra={"message_type": message.get("type")})
             
             if message["type"] == "start_camera":
                 camera_id = message.get("camera_id", 0)
@@ -171,8 +271,16 @@ async def websocket_camera(websocket: WebSocket):
                 
                 # Store GPS location for this session
                 if gps_location:
+                    try:
+                        gps_location = GpsLocation.model_validate(gps_location).model_dump(exclude_none=True)
+                    except ValidationError as e:
+                        await websocket.send_text(json.dumps({
+                            "type": "camera_error",
+                            "message": f"Invalid GPS location: {e.errors()[0]['msg']}"
+                        }))
+                        continue
                     manager.gps_location = gps_location
-                    print(f"📍 GPS Location set: {gps_location}")
+                    logger.info(f"📍 GPS Location set: {gps_location}")
                 
                 success = await manager.start_camera(camera_id)
                 
@@ -190,6 +298,10 @@ async def websocket_camera(websocket: WebSocket):
                         "message": "Failed to start camera"
                     }))
                     
+            elif message["type"] == "telemetry":
+                # High-rate position feed for the stream; no reply per message
+                _ingest_telemetry(message.get("stream_id") or manager.stream_id or "0", message.get("samples", []))
+
             elif message["type"] == "stop_camera":
                 await manager.stop_camera()
                 await websocket.send_text(json.dumps({
@@ -198,14 +310,228 @@ async def websocket_camera(websocket: WebSocket):
                 }))
                 
     except WebSocketDisconnect:
-        print("📱 WebSocket disconnected")
+        logger.info("📱 WebSocket disconnected")
         manager.disconnect(websocket)
         if len(manager.active_connections) == 0:
             await manager.stop_camera()
     except Exception as e:
-        print(f"❌ WebSocket error: {e}")
+        logger.error(f"❌ WebSocket error: {e}")
         manager.disconnect(websocket)
 
+def _ingest_telemetry(stream_id, samples):
+    if isinstance(samples, dict) and not isinstance(samples.get("lat"), list):
+        samples = [samples]
+    try:
+        return telemetry_store.ingest(str(stream_id), samples)
+    except (KeyError, ValueError, TypeError) as e:
+        frame_log.warning(f"⚠️  Bad telemetry for stream {stream_id}: {e}")
+        return 0
+
+@router.websocket("/ws/telemetry")
+async def websocket_telemetry(websocket: WebSocket, stream_id: str = "0", token: str = ""):
+    """Telemetry-only feed: messages are one sample, a list of samples, or a dict of columns (SECRET clearance, ?token=)"""
+    user = user_from_token(token)
+    if user is None or not has_clearance(user, "SECRET"):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    logger.info(f"🛰️  Telemetry feed connected for stream {stream_id}")
+    try:
+        while True:
+            message = json.loads(await websocket.receive_text())
+            samples = message.get("samples", message) if isinstance(message, dict) else message
+            _ingest_telemetry(stream_id, samples)
+    except WebSocketDisconnect:
+        logger.info(f"🛰️  Telemetry feed disconnected for stream {stream_id}")
+    except Exception as e:
+        logger.error(f"❌ Telemetry WebSocket error: {e}")
+
+@router.websocket("/ws/events")
+async def websocket_threat_events(websocket: WebSocket, stream_id: Optional[str] = None, token: str = ""):
+    """WebSocket endpoint that pushes threat events only, never frames (SECRET clearance, ?token=)"""
+    user = user_from_token(token)
+    if user is None or not has_clearance(user, "SECRET"):
+        # Closing before accept rejects the handshake with 403
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    queue = threat_engine.subscribe(stream_id)
+    try:
+        while True:
+            event = await queue.get()
+            await websocket.send_text(json.dumps(event))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"❌ Event WebSocket error: {e}")
+    finally:
+        threat_engine.unsubscribe(queue)
+
+@router.get("/zones")
+async def list_zones(current_user = Depends(require_clearance_level("SECRET"))):
+    """List configured threat zones"""
+    return {"zones": threat_engine.list_zones()}
+
+@router.put("/zones/{zone_id}")
+async def put_zone(zone_id: str, zone: ZoneConfig, current_user = Depends(require_clearance_level("SECRET"))):
+    """Create or replace a pixel or GPS threat zone"""
+    if zone.zone_id != zone_id:
+        raise HTTPException(status_code=400, detail="ZONE ID MISMATCH")
+    threat_engine.set_zone(zone)
+    return {"status": "success", "zone": zone.model_dump()}
+
+@router.delete("/zones/{zone_id}")
+async def delete_zone(zone_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Remove a threat zone"""
+    if not threat_engine.remove_zone(zone_id):
+        raise HTTPException(status_code=404, detail="ZONE NOT FOUND")
+    return {"status": "success"}
+
+@router.get("/events")
+async def recent_events(
+    limit: int = 50,
+    stream_id: Optional[str] = None,
+    current_user = Depends(require_clearance_level("SECRET"))
+):
+    """Most recent threat events, newest first"""
+    return {"events": threat_engine.get_recent_events(min(max(limit, 1), 500), stream_id)}
+
+@router.get("/streams/{stream_id}/roi")
+async def get_stream_roi(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Region-of-interest config for a stream"""
+    roi = stream_rois.get(stream_id)
+    if roi is None:
+        raise HTTPException(status_code=404, detail="ROI NOT CONFIGURED")
+    return {"stream_id": stream_id, "roi": roi.config.model_dump()}
+
+@router.put("/streams/{stream_id}/roi")
+async def put_stream_roi(stream_id: str, config: StreamROIConfig,
+                         current_user = Depends(require_clearance_level("SECRET"))):
+    """Set include/exclude polygons for a stream; frames are cropped to the include area before inference"""
+    stream_rois[stream_id] = StreamROI(config)
+    logger.info(f"🎯 ROI configured for stream {stream_id}", extra={
+        "stream_id": stream_id,
+        "include": len(config.include or []),
+        "exclude": len(config.exclude or [])
+    })
+    return {"status": "success", "stream_id": stream_id, "roi": config.model_dump()}
+
+@router.delete("/streams/{stream_id}/roi")
+async def delete_stream_roi(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Go back to full-frame detection for a stream"""
+    if stream_rois.pop(stream_id, None) is None:
+        raise HTTPException(status_code=404, detail="ROI NOT CONFIGURED")
+    return {"status": "success"}
+
+@router.get("/streams/{stream_id}/classes")
+async def get_stream_classes(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Per-class detection rules for a stream"""
+    spec = stream_class_specs.get(stream_id)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="CLASS SPEC NOT CONFIGURED")
+    return {"stream_id": stream_id, "spec": spec.model_dump()}
+
+@router.put("/streams/{stream_id}/classes")
+async def put_stream_classes(stream_id: str, spec: DetectionSpec,
+                             current_user = Depends(require_clearance_level("SECRET"))):
+    """Detect several classes on a stream in one pass, with per-class thresholds and threat weights"""
+    try:
+        get_camera_manager().model_wrapper.compile_spec(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"INVALID CLASSES - {e}")
+    stream_class_specs[stream_id] = spec
+    logger.info(f"🏷️  Class spec configured for stream {stream_id}", extra={
+        "stream_id": stream_id,
+        "classes": [rule.name for rule in spec.classes]
+    })
+    return {"status": "success", "stream_id": stream_id, "spec": spec.model_dump()}
+
+@router.delete("/streams/{stream_id}/classes")
+async def delete_stream_classes(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Go back to person-only detection for a stream"""
+    if stream_class_specs.pop(stream_id, None) is None:
+        raise HTTPException(status_code=404, detail="CLASS SPEC NOT CONFIGURED")
+    return {"status": "success"}
+
+@router.get("/streams/{stream_id}/inference")
+async def get_stream_inference(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Inference resolution policy for a stream"""
+    spec = stream_inference_specs.get(stream_id)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="INFERENCE POLICY NOT CONFIGURED")
+    return {"stream_id": stream_id, "policy": spec.model_dump()}
+
+@router.put("/streams/{stream_id}/inference")
+async def put_stream_inference(stream_id: str, spec: InferenceSpec,
+                               current_user = Depends(require_clearance_level("SECRET"))):
+    """Quality tier or latency budget (and optional refine pass) for a stream's frames"""
+    stream_inference_specs[stream_id] = spec
+    logger.info(f"🔭 Inference policy configured for stream {stream_id}", extra={
+        "stream_id": stream_id, **spec.model_dump()
+    })
+    return {"status": "success", "stream_id": stream_id, "policy": spec.model_dump()}
+
+@router.delete("/streams/{stream_id}/inference")
+async def delete_stream_inference(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Go back to the default stream resolution"""
+    if stream_inference_specs.pop(stream_id, None) is None:
+        raise HTTPException(status_code=404, detail="INFERENCE POLICY NOT CONFIGURED")
+    return {"status": "success"}
+
+@router.post("/streams/{stream_id}/telemetry")
+async def post_stream_telemetry(stream_id: str, batch: TelemetryBatch,
+                                current_user = Depends(require_clearance_level("SECRET"))):
+    """Ingest GPS/altitude/heading samples for a stream"""
+    try:
+        accepted = telemetry_store.ingest(stream_id, batch.samples)
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"INVALID TELEMETRY - {e}")
+    return {"status": "success", "accepted": accepted}
+
+@router.get("/streams/{stream_id}/telemetry")
+async def get_stream_telemetry(stream_id: str, current_user = Depends(require_clearance_level("SECRET"))):
+    """Telemetry buffer state and the current interpolated position"""
+    status = telemetry_store.get_status(stream_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="NO TELEMETRY FOR STREAM")
+    return {"stream_id": stream_id, **status, "position": telemetry_store.position_at(stream_id, time.time())}
+
+@router.get("/sorties")
+async def list_sorties(current_user = Depends(require_clearance_level("SECRET"))):
+    """Recorded sorties, oldest first"""
+    return {"sorties": await asyncio.to_thread(telemetry_store.list_sorties)}
+
+@router.get("/sorties/query")
+async def query_sorties(
+    bbox: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    current_user = Depends(require_clearance_level("SECRET"))
+):
+    """Time spans over, and detections inside, a ``min_lon,min_lat,max_lon,max_lat`` box"""
+    area = None
+    if bbox:
+        try:
+            area = [float(v) for v in bbox.split(",")]
+        except ValueError:
+            area = []
+        if len(area) != 4:
+            raise HTTPException(status_code=400, detail="INVALID BBOX - USE min_lon,min_lat,max_lon,max_lat")
+    return {"results": await asyncio.to_thread(telemetry_store.query, area, since, until)}
+
+@router.get("/sorties/{sortie_id}")
+async def replay_sortie(sortie_id: str, step: int = 1, current_user = Depends(require_clearance_level("SECRET"))):
+    """Decoded track (every ``step``-th sample) and detections of one sortie"""
+    sortie = await asyncio.to_thread(telemetry_store.load_sortie, sortie_id)
+    if sortie is None:
+        raise HTTPException(status_code=404, detail="SORTIE NOT FOUND")
+    meta, track, detections = sortie
+    return {
+        **meta,
+        "track": {name: track[::max(step, 1), i].tolist() for i, name in enumerate(TRACK_COLUMNS)},
+        "detection_records": rows_to_dicts(detections, DETECTION_COLUMNS)
+    }
+
 @router.get("/status")
 async def camera_status():
     """Get camera status - NO AUTH REQUIRED FOR TESTING"""
@@ -214,6 +540,7 @@ async def camera_status():
         "is_streaming": manager.is_streaming,
         "active_connections": len(manager.active_connections),
         "camera_available": manager.camera is not None,
+        "dropped_frames": manager.dropped_frames,
         "status": "operational"
     }
 
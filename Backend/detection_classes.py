@@ -0,0 +1,123 @@
+"""
+Multi-class detection specs.
+
+A spec lists the classes to report, each with its own confidence threshold
+and threat weight. All classes come out of one forward pass: the model is
+called with the union of class IDs and the lowest threshold, then per-class
+thresholds are applied with a lookup-table mask over the whole result.
+Threat level is assessed from the weighted class counts.
+
+Query-string form: ``person:0.5:1,car:0.6:2,backpack:0.4:0.5``
+(name[:confidence[:weight]]; omitted parts fall back to the defaults).
+"""
+
+from typing import List
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+# Class names of the COCO-trained weights; used when a model has no names
+COCO_NAMES = {i: name for i, name in enumerate([
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+])}
+
+
+class ClassRule(BaseModel):
+    name: str
+    confidence: float = Field(0.5, ge=0.0, le=1.0)
+    weight: float = Field(1.0, ge=0.0)
+
+
+class DetectionSpec(BaseModel):
+    classes: List[ClassRule] = Field(..., min_length=1)
+
+
+def parse_class_spec(text, default_confidence=None):
+    """``"person:0.5:1,car:0.6:2"`` -> DetectionSpec"""
+    rules = []
+    for item in text.split(","):
+        parts = [p.strip() for p in item.split(":")]
+        if not parts[0]:
+            continue
+        if len(parts) > 3:
+            raise ValueError(f"Bad class rule '{item}' - use name[:confidence[:weight]]")
+        rule = {"name": parts[0]}
+        if default_confidence is not None:
+            rule["confidence"] = default_confidence
+        if len(parts) > 1 and parts[1]:
+            rule["confidence"] = float(parts[1])
+        if len(parts) > 2 and parts[2]:
+            rule["weight"] = float(parts[2])
+        rules.append(rule)
+    return DetectionSpec(classes=rules)
+
+
+class CompiledSpec:
+    """A spec resolved against one model's class names, as lookup tables"""
+
+    def __init__(self, spec: DetectionSpec, names):
+        ids_by_name = {str(name).lower(): int(i) for i, name in names.items()}
+        self.names = {int(i): str(name) for i, name in names.items()}
+        size = max(self.names) + 1 if self.names else 1
+
+        # Classes not in the spec keep an unreachable threshold and zero weight
+        self.thresholds = np.full(size, np.inf, dtype=np.float32)
+        self.weights = np.zeros(size, dtype=np.float32)
+        self.class_ids = []
+        self.min_confidence = min(rule.confidence for rule in spec.classes)
+        for rule in spec.classes:
+            key = rule.name.lower()
+            if key in ids_by_name:
+                class_id = ids_by_name[key]
+            elif key.isdigit() and int(key) in self.names:
+                class_id = int(key)
+            else:
+                raise ValueError(f"Unknown class '{rule.name}'")
+            self.thresholds[class_id] = rule.confidence
+            self.weights[class_id] = rule.weight
+            self.class_ids.append(class_id)
+        self.class_ids = sorted(set(self.class_ids))
+
+    def apply(self, detections):
+        """Per-class confidence thresholds as one vectorized mask"""
+        if not len(detections):
+            return detections
+        classes = np.clip(detections.classes, 0, len(self.thresholds) - 1)
+        return detections.filter(detections.scores >= self.thresholds[classes])
+
+    def detection_weights(self, detections):
+        """Threat weight of each detection"""
+        return self.weights[np.clip(detections.classes, 0, len(self.weights) - 1)]
+
+    def threat_score(self, detections):
+        if not len(detections):
+            return 0.0
+        return float(self.detection_weights(detections).sum())
+
+    def class_counts(self, detections):
+        counts = np.bincount(detections.classes, minlength=len(self.thresholds))
+        return {self.names[i]: int(counts[i]) for i in self.class_ids}
+
+
+def assess_threat(score):
+    """Weighted threat score -> level (person-only weight 1 matches the old count rule)"""
+    if score > 3:
+        return "CRITICAL"
+    if score > 1:
+        return "HIGH"
+    if score > 0:
+        return "MEDIUM"
+    return "LOW"
+
+
+# Active class spec per stream ID
+stream_class_specs = {}
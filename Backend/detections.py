@@ -0,0 +1,127 @@
+"""
+Array-backed detection results.
+
+A ``Detections`` holds N boxes as contiguous arrays (N x 4 xyxy float32
+boxes, N scores, N class IDs, optional N track IDs). It is filled from one
+``boxes.data`` device-to-host copy per image, and filtering, rescaling and
+NMS merging operate on whole arrays. Python lists are only built at the
+JSON boundary (``boxes_list`` / ``to_json``).
+"""
+
+import numpy as np
+
+
+class Detections:
+    __slots__ = ("boxes", "scores", "classes", "track_ids")
+
+    def __init__(self, boxes=None, scores=None, classes=None, track_ids=None):
+        self.boxes = np.zeros((0, 4), dtype=np.float32) if boxes is None else np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        n = len(self.boxes)
+        self.scores = np.zeros(n, dtype=np.float32) if scores is None else np.asarray(scores, dtype=np.float32).reshape(n)
+        self.classes = np.zeros(n, dtype=np.int32) if classes is None else np.asarray(classes, dtype=np.int32).reshape(n)
+        self.track_ids = None if track_ids is None else np.asarray(track_ids, dtype=np.int64).reshape(n)
+
+    @classmethod
+    def empty(cls):
+        return cls()
+
+    @classmethod
+    def from_result(cls, result):
+        """Build from one ultralytics result with a single device-to-host copy"""
+        if result.boxes is None or len(result.boxes) == 0:
+            return cls()
+        data = result.boxes.data.cpu().numpy()
+        if data.shape[1] == 7:
+            # Tracked results: x1, y1, x2, y2, track_id, conf, cls
+            return cls(data[:, :4], data[:, 5], data[:, 6], data[:, 4])
+        return cls(data[:, :4], data[:, 4], data[:, 5])
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls()
+        track_ids = None
+        if all(p.track_ids is not None for p in parts):
+            track_ids = np.concatenate([p.track_ids for p in parts])
+        return cls(
+            np.concatenate([p.boxes for p in parts]),
+            np.concatenate([p.scores for p in parts]),
+            np.concatenate([p.classes for p in parts]),
+            track_ids,
+        )
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def filter(self, mask):
+        """Keep rows selected by a boolean mask or index array"""
+        return Detections(
+            self.boxes[mask], self.scores[mask], self.classes[mask],
+            None if self.track_ids is None else self.track_ids[mask],
+        )
+
+    def rescale(self, scale=1.0, offset_x=0.0, offset_y=0.0):
+        """Map boxes from a resized/cropped input back to the source: box / scale + offset"""
+        if scale == 1.0 and not offset_x and not offset_y:
+            return self
+        boxes = self.boxes / np.float32(scale)
+        boxes += np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+        return Detections(boxes, self.scores, self.classes, self.track_ids)
+
+    def iou(self, other=None):
+        """Pairwise IoU matrix (N x M) against ``other`` (default: self)"""
+        other = self if other is None else other
+        a = self.boxes[:, None, :]
+        b = other.boxes[None, :, :]
+        inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+        inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+        inter = inter_w * inter_h
+        area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+        area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+        union = area_a + area_b - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def nms(self, iou_threshold=0.5, class_aware=True):
+        """Greedy non-maximum suppression over the full IoU matrix"""
+        if len(self) < 2:
+            return self
+        order = np.argsort(-self.scores, kind="stable")
+        ordered = self.filter(order)
+        overlaps = ordered.iou() > iou_threshold
+        if class_aware:
+            overlaps &= ordered.classes[:, None] == ordered.classes[None, :]
+        suppressed = np.zeros(len(ordered), dtype=bool)
+        keep = np.zeros(len(ordered), dtype=bool)
+        for i in range(len(ordered)):
+            if suppressed[i]:
+                continue
+            keep[i] = True
+            suppressed |= overlaps[i]
+        return ordered.filter(keep)
+
+    @classmethod
+    def merge(cls, parts, iou_threshold=0.5):
+        """Combine overlapping result sets (tiles, multi-scale passes) and suppress duplicates"""
+        return cls.concat(parts).nms(iou_threshold)
+
+    # JSON boundary
+
+    def boxes_list(self):
+        return self.boxes.tolist()
+
+    def scores_list(self):
+        return self.scores.tolist()
+
+    def labels(self, names):
+        """Class name per box"""
+        return [names.get(c, str(c)) for c in self.classes.tolist()]
+
+    def to_json(self, names=None):
+        """The wire shape existing clients read: boxes, count, confidences (plus labels if names given)"""
+        data = {"boxes": self.boxes_list(), "count": len(self), "confidences": self.scores_list()}
+        if names is not None:
+            data["labels"] = self.labels(names)
+        if self.track_ids is not None:
+            data["track_ids"] = self.track_ids.tolist()
+        return data
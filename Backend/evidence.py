@@ -0,0 +1,305 @@
+"""
+Evidence snapshot store.
+
+When a stream detects people, the annotated frame (the JPEG already encoded
+for the WebSocket, so nothing is encoded twice) and a small thumbnail are
+written to disk and indexed in SQLite with the detection record and any
+threat events it raised.
+
+``submit`` only does a rate-limit check and a queue hand-off, so the capture
+loop never waits on disk. Hashing, thumbnailing, file writes and the index
+insert run on one writer thread that owns the write connection; the read
+endpoints use their own connection (WAL lets them read alongside it).
+Static scenes are deduplicated with an average hash: a frame that looks
+like the last one stored for the stream, with the same number of people,
+is skipped.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from storage import safe_name
+
+logger = logging.getLogger("guardx.evidence")
+
+EVIDENCE_ENABLED = os.getenv("GUARDX_EVIDENCE_ENABLED", "1") == "1"
+EVIDENCE_DIR = Path(os.getenv("GUARDX_EVIDENCE_DIR", "evidence"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evidence (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stream_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    count INTEGER NOT NULL,
+    boxes TEXT NOT NULL,
+    confidences TEXT NOT NULL,
+    event_ids TEXT NOT NULL,
+    gps_location TEXT,
+    width INTEGER,
+    height INTEGER,
+    image_path TEXT NOT NULL,
+    thumb_path TEXT NOT NULL,
+    ahash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evidence_stream_id ON evidence (stream_id, id);
+CREATE INDEX IF NOT EXISTS evidence_timestamp ON evidence (timestamp);
+"""
+
+
+def average_hash(frame, size=8):
+    """64-bit perceptual hash: grayscale, shrink to 8x8, threshold at the mean"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    bits = (small > small.mean()).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class EvidenceStore:
+    def __init__(self, root=EVIDENCE_DIR, min_interval=None, max_pending=None,
+                 thumb_width=160, dedup_distance=5):
+        self.root = Path(root)
+        # Seconds between stored frames per stream
+        self.min_interval = min_interval if min_interval is not None else float(
+            os.getenv("GUARDX_EVIDENCE_MIN_INTERVAL", 2.0))
+        # Frames waiting for the writer thread; beyond this new frames are dropped
+        self.max_pending = max_pending if max_pending is not None else int(
+            os.getenv("GUARDX_EVIDENCE_MAX_PENDING", 32))
+        self.thumb_width = thumb_width
+        # Max differing hash bits for two frames to count as the same scene
+        self.dedup_distance = dedup_distance
+
+        self.pending = 0
+        self.stored = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self.failed = 0
+
+        # Guards the counters and rate-limit state only, never disk or DB work
+        self._lock = threading.Lock()
+        self._last_submit = {}
+        # Dedup state; only touched by the writer thread
+        self._last_hash = {}
+        self._queue = None
+        self._writer = None
+        self._read_db = None
+        self._read_lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.root / "index.sqlite3", check_same_thread=False, timeout=10)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def open(self):
+        """Create the index and start the writer thread (blocking; run off the event loop)"""
+        # Per process: serve.py forks workers after import
+        if self._pid == os.getpid():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        db = self._connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+        self._read_db = self._connect()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, args=(db,),
+                                        name="guardx-evidence", daemon=True)
+        self._writer.start()
+        self._pid = os.getpid()
+
+    @property
+    def is_open(self):
+        return self._pid == os.getpid()
+
+    # Write path
+
+    def submit(self, stream_id, annotated_frame, jpeg, detection_result, timestamp=None,
+               gps_location=None, events=None):
+        """Queue a detected frame for storage; never blocks. Returns True if queued."""
+        if not detection_result["count"] or not self.is_open:
+            return False
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            last = self._last_submit.get(stream_id)
+            if last is not None and timestamp - last < self.min_interval and not events:
+                # Frames that raised a threat event are always kept
+                self.rate_limited += 1
+                return False
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._last_submit[stream_id] = timestamp
+            self.pending += 1
+
+        record = {
+            "stream_id": stream_id,
+            "timestamp": timestamp,
+            "count": detection_result["count"],
+            "detections": detection_result["detections"],
+            "event_ids": [e["event_id"] for e in events or []],
+            "gps_location": gps_location,
+        }
+        self._queue.put_nowait((record, annotated_frame, jpeg))
+        return True
+
+    def _run_writer(self, db):
+        # The only thread that writes to the index, on its own connection
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(db, *item)
+            finally:
+                with self._lock:
+                    self.pending -= 1
+        db.close()
+
+    def _write(self, db, record, frame, jpeg):
+        try:
+            stream_id = record["stream_id"]
+            frame_hash = average_hash(frame)
+            previous = self._last_hash.get(stream_id)
+            if previous is not None and not record["event_ids"]:
+                last_hash, last_count = previous
+                if last_count == record["count"] and bin(frame_hash ^ last_hash).count("1") <= self.dedup_distance:
+                    with self._lock:
+                        self.deduplicated += 1
+                    return
+            self._last_hash[stream_id] = (frame_hash, record["count"])
+
+            height, width = frame.shape[:2]
+            thumb_height = max(int(height * self.thumb_width / width), 1)
+            thumb = cv2.resize(frame, (self.thumb_width, thumb_height), interpolation=cv2.INTER_AREA)
+            ok, thumb_jpeg = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            if not ok:
+                raise RuntimeError("thumbnail encode failed")
+
+            moment = datetime.fromtimestamp(record["timestamp"])
+            folder = self.root / moment.strftime("%Y%m%d") / safe_name(stream_id)
+            folder.mkdir(parents=True, exist_ok=True)
+            stem = f"{moment.strftime('%H%M%S')}-{int(record['timestamp'] * 1000) % 1000:03d}-{os.getpid()}"
+            image_path = folder / f"{stem}.jpg"
+            thumb_path = folder / f"{stem}.thumb.jpg"
+            self._write_file(image_path, jpeg)
+            self._write_file(thumb_path, thumb_jpeg)
+
+            db.execute(
+                "INSERT INTO evidence (stream_id, timestamp, count, boxes, confidences, event_ids,"
+                " gps_location, width, height, image_path, thumb_path, ahash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    stream_id, record["timestamp"], record["count"],
+                    json.dumps(record["detections"].boxes_list()),
+                    json.dumps(record["detections"].scores_list()),
+                    json.dumps(record["event_ids"]),
+                    json.dumps(record["gps_location"]) if record["gps_location"] else None,
+                    width, height,
+                    str(image_path.relative_to(self.root)), str(thumb_path.relative_to(self.root)),
+                    f"{frame_hash:016x}",
+                ),
+            )
+            db.commit()
+            with self._lock:
+                self.stored += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"❌ Evidence write failed: {e}", extra={"stream_id": record["stream_id"]})
+
+    @staticmethod
+    def _write_file(path, data):
+        # Write then rename so readers never see a partial JPEG
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data.tobytes() if isinstance(data, np.ndarray) else data)
+        os.replace(tmp_path, path)
+
+    # Read path
+
+    def _row_to_record(self, row):
+        return {
+            "id": row["id"],
+            "stream_id": row["stream_id"],
+            "timestamp": row["timestamp"],
+            "count": row["count"],
+            "boxes": json.loads(row["boxes"]),
+            "confidences": json.loads(row["confidences"]),
+            "event_ids": json.loads(row["event_ids"]),
+            "gps_location": json.loads(row["gps_location"]) if row["gps_location"] else None,
+            "width": row["width"],
+            "height": row["height"],
+        }
+
+    def query(self, stream_id=None, since=None, until=None, before_id=None, limit=50):
+        """Newest first, keyset-paginated on id; returns (records, next_cursor)"""
+        clauses, params = [], []
+        if stream_id is not None:
+            clauses.append("stream_id = ?")
+            params.append(stream_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if not self.is_open:
+            return [], None
+        with self._read_lock:
+            rows = self._read_db.execute(
+                f"SELECT * FROM evidence {where} ORDER BY id DESC LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+        records = [self._row_to_record(row) for row in rows[:limit]]
+        next_cursor = records[-1]["id"] if len(rows) > limit else None
+        return records, next_cursor
+
+    def get(self, evidence_id):
+        if not self.is_open:
+            return None
+        with self._read_lock:
+            row = self._read_db.execute("SELECT * FROM evidence WHERE id = ?", (evidence_id,)).fetchone()
+        if row is None:
+            return None
+        record = self._row_to_record(row)
+        record["image_path"] = self.root / row["image_path"]
+        record["thumb_path"] = self.root / row["thumb_path"]
+        return record
+
+    def get_status(self):
+        return {
+            "enabled": EVIDENCE_ENABLED,
+            "directory": str(self.root),
+            "pending": self.pending,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def close(self):
+        """Drain queued writes and stop the writer thread"""
+        if not self.is_open:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._read_db.close()
+        self._pid = None
+
+# Global evidence store shared by all streams
+evidence_store = EvidenceStore()
@@ -0,0 +1,50 @@
+"""
+Vectorized geometry helpers for zones and masks.
+
+Polygons are (M, 2) arrays of vertices; points are (N, 2) arrays. Tests run
+over all points and all edges at once, so cost grows with N x M in numpy
+rather than in Python loops.
+"""
+
+import numpy as np
+
+
+def as_polygon(vertices):
+    polygon = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    if len(polygon) < 3:
+        raise ValueError("A polygon needs at least 3 vertices")
+    return polygon
+
+
+def points_in_polygon(points, polygon):
+    """Even-odd ray casting for every point against one polygon -> (N,) bool"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+
+    x = points[:, 0:1]  # (N, 1)
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]  # (M,)
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    # Edges that straddle the horizontal ray through each point
+    straddles = (y1 > y) != (y2 > y)  # (N, M)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < x_cross)
+    return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+
+def points_in_any(points, polygons):
+    """True where a point lies inside at least one polygon -> (N,) bool"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    inside = np.zeros(len(points), dtype=bool)
+    for polygon in polygons:
+        inside |= points_in_polygon(points, polygon)
+    return inside
+
+
+def box_anchor_points(boxes):
+    """Bottom-centre of each xyxy box: where a person stands on the ground"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]], axis=1)
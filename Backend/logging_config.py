@@ -0,0 +1,186 @@
+"""
+Structured, non-blocking logging for the Guard-X backend.
+
+Log calls only enqueue the record; a single listener thread formats it and
+writes to stdout, so slow container log drivers never stall the event loop.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import atexit
+
+# Request ID of the request currently being served, set by the HTTP middleware
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+_settings = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp each record with the active request ID"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including request ID and ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+# Formats tracebacks before records cross to the writer thread
+_plain_formatter = logging.Formatter()
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback out of ``msg``
+
+    The stock ``prepare`` formats the whole record (traceback included) into
+    ``msg`` and drops ``exc_info``. Here the message is merged with its args
+    and the traceback goes to ``exc_text``, so the writer's formatter can
+    still emit it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _plain_formatter.formatException(record.exc_info)
+            # Traceback objects stay on this thread
+            record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+
+def setup_logging(level=None, json_output=None):
+    """Route all logging through a queue to a background writer thread"""
+    global _listener, _settings
+    if _listener is not None:
+        return
+    _settings = (level, json_output)
+
+    level = (level or os.getenv("GUARDX_LOG_LEVEL", "INFO")).upper()
+    if json_output is None:
+        json_output = os.getenv("GUARDX_LOG_FORMAT", "json").lower() == "json"
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+
+    # Unbounded queue: enqueueing never blocks the caller
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    """The listener thread does not survive fork(); start a fresh one in the child"""
+    global _listener
+    if _listener is None:
+        return
+    _listener = None
+    setup_logging(*_settings)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+class RateLimitedLogger:
+    """Emit at most one record per ``interval`` seconds; counts what it drops.
+
+    Meant for per-frame logging in stream loops, where logging every frame
+    would dominate the loop.
+    """
+
+    def __init__(self, logger, interval=5.0):
+        self.logger = logger
+        self.interval = interval
+        self._next_emit = 0.0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def _should_emit(self):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_emit:
+                self._suppressed += 1
+                return None
+            self._next_emit = now + self.interval
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._should_emit()
+        if suppressed is None:
+            return
+        extra = dict(kwargs.pop("extra", None) or {})
+        extra["suppressed"] = suppressed
+        self.logger.log(level, msg, *args, extra=extra, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
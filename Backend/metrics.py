@@ -0,0 +1,395 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Recording is a dict lookup, a bisect over the bucket bounds and a few
+integer increments under an uncontended lock, so it stays on in
+production. Values that already live elsewhere (queue depths, admission
+counters) are read through callbacks at scrape time instead of being
+mirrored on every request.
+"""
+
+import bisect
+import contextvars
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond encode steps to slow CPU inference
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        key = tuple(str(v) for v in values) if values else tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def collect(self):
+        """Yield exposition lines for every labelled child"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.collect())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def collect(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def collect(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def collect(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are produced by a function at scrape time.
+
+    The callback returns either a number or a dict mapping label-value
+    tuples to numbers.
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), type_name="gauge"):
+        self.callback = callback
+        self.type_name = type_name
+        self.labelnames = tuple(labelnames)
+        self.name = name
+        self.documentation = documentation
+
+    def collect(self):
+        samples = self.callback()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        for key, value in samples.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, callback, labelnames=(), type_name="gauge"):
+        return self._register(CallbackMetric(name, documentation, callback, labelnames, type_name))
+
+    def render(self):
+        """Render all metrics in Prometheus text format 0.0.4"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # A broken callback must not take the whole scrape down
+                continue
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the pipeline metrics shared across modules
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.histogram(
+    "guardx_stage_seconds",
+    "Latency of each detection pipeline stage",
+    ["pipeline", "stage"],
+)
+MODEL_INFERENCES = registry.counter(
+    "guardx_model_inferences_total",
+    "Model forward passes",
+    ["model", "pipeline"],
+)
+MODEL_DETECTIONS = registry.counter(
+    "guardx_model_detections_total",
+    "Boxes returned by the model",
+    ["model", "pipeline"],
+)
+STREAM_FRAMES = registry.counter(
+    "guardx_stream_frames_total",
+    "Frames captured per stream",
+    ["stream"],
+)
+STREAM_DROPS = registry.counter(
+    "guardx_stream_dropped_frames_total",
+    "Frames or sends dropped per stream",
+    ["stream", "reason"],
+)
+STREAM_FPS = registry.gauge(
+    "guardx_stream_fps",
+    "Smoothed frames per second delivered per stream",
+    ["stream"],
+)
+
+# Distinct stream label values kept before new streams share "other"
+MAX_STREAM_LABELS = 32
+_stream_labels = {}
+_stream_labels_lock = threading.Lock()
+
+
+def stream_label(stream_id):
+    """Label for a stream on /metrics: device indexes as-is, URLs and paths as a short hash
+
+    Stream IDs can be RTSP URLs with credentials, and /metrics is not
+    authenticated, so the raw ID is never published.
+    """
+    stream_id = str(stream_id)
+    with _stream_labels_lock:
+        label = _stream_labels.get(stream_id)
+        if label is None:
+            if len(_stream_labels) >= MAX_STREAM_LABELS:
+                return "other"
+            if stream_id.isdigit() and len(stream_id) <= 3:
+                label = stream_id
+            else:
+                label = "stream-" + hashlib.sha1(stream_id.encode("utf-8")).hexdigest()[:10]
+            _stream_labels[stream_id] = label
+    return label
+
+
+# Per-request stage list, only set while an admin trace is active
+_active_trace = contextvars.ContextVar("guardx_trace", default=None)
+
+
+class _TracedTimer(_Timer):
+    __slots__ = ("_trace", "_name")
+
+    def __init__(self, child, trace, name):
+        super().__init__(child)
+        self._trace = trace
+        self._name = name
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        self._child.observe(elapsed)
+        self._trace.append((self._name, elapsed))
+        return False
+
+
+def stage(pipeline, name):
+    """Time a pipeline stage: ``with stage("detect", "decode"): ...``"""
+    child = STAGE_LATENCY.labels(pipeline, name)
+    trace = _active_trace.get()
+    if trace is None:
+        return _Timer(child)
+    return _TracedTimer(child, trace, name)
+
+
+def record_stage(pipeline, name, seconds):
+    """Record a stage duration measured elsewhere"""
+    STAGE_LATENCY.labels(pipeline, name).observe(seconds)
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+@contextmanager
+def request_trace():
+    """Collect ``(stage, seconds)`` pairs for the current request"""
+    trace = []
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+
+
+def format_trace(trace):
+    """Trace as JSON; ``model_*`` stages are inside ``inference`` and not summed"""
+    return {
+        "stages": [{"stage": name, "ms": round(seconds * 1000, 3)} for name, seconds in trace],
+        "total_ms": round(sum(seconds for name, seconds in trace if not name.startswith("model_")) * 1000, 3),
+    }
+
+
+class FpsMeter:
+    """Exponentially smoothed frame rate, published to ``STREAM_FPS``"""
+
+    def __init__(self, stream, alpha=0.1):
+        self._gauge = STREAM_FPS.labels(stream)
+        self._alpha = alpha
+        self._last = None
+        self.fps = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            interval = now - self._last
+            if interval > 0:
+                instant = 1.0 / interval
+                self.fps = instant if self.fps == 0.0 else self.fps + self._alpha * (instant - self.fps)
+                self._gauge.set(round(self.fps, 2))
+        self._last = now
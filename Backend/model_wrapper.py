@@ -1,155 +1,403 @@
-import torch
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from pathlib import Path
+import json
+import os
 import time
 from PIL import Image
 import asyncio
+import logging
+from metrics import stage, record_stage, MODEL_INFERENCES, MODEL_DETECTIONS
+from profiling import profiled
+from stub_model import STUB_MODEL_ENABLED, StubModel
+from detections import Detections
+from detection_classes import COCO_NAMES, CompiledSpec
+from resolution import LatencyModel, REFINE_IMGSZ, REFINE_CONFIDENT, resolve_imgsz, refine_regions, detections_floor
+
+try:
+    import torch
+    from ultralytics import YOLO
+except ImportError:
+    # Only the stub model (GUARDX_STUB_MODEL=1) can run without the ML stack
+    if not STUB_MODEL_ENABLED:
+        raise
+    torch = None
+    YOLO = None
+
+logger = logging.getLogger("guardx.model")
+
+# Written by benchmarks/inference_bench.py; absent means library defaults
+INFERENCE_CONFIG_PATH = Path(os.getenv("GUARDX_INFERENCE_CONFIG", "inference_config.json"))
+MODEL_NAMES = {"models/best.pt": "custom", "yolov8n.pt": "yolo"}
+
+
+def _same_weights(a, b):
+    """Compare weight paths however they are spelled (./models/best.pt, absolute, ...)"""
+    return bool(a) and bool(b) and Path(a).resolve() == Path(b).resolve()
+
+
+def load_inference_config(path=INFERENCE_CONFIG_PATH):
+    """Read the recommended inference config, if one has been generated"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Ignoring unreadable inference config {path}: {e}")
+        return {}
+
+
+def _record_model_speed(pipeline, results):
+    """Export ultralytics' own pre/inference/post split (reported in ms)"""
+    if not results:
+        return
+    speed = getattr(results[0], "speed", None) or {}
+    for name, ms in speed.items():
+        if ms is not None:
+            record_stage(pipeline, f"model_{name}", ms / 1000)
 
 class ModelWrapper:
     def __init__(self):
         self.models = {}
         self.active_model_name = None
         self.confidence_threshold = 0.5
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = 'cuda' if torch is not None and torch.cuda.is_available() else 'cpu'
+        self.inference_config = {}
+        self.imgsz = None  # ultralytics default for uploaded images
+        self.realtime_imgsz = 640
+        self._compiled_specs = {}
+        self.latency = LatencyModel()
+        self._model_weights = {}
+        # (imgsz, batch) when the active model is a static-shape export
+        self.fixed_shape = None
+        
+    def _apply_inference_config(self, config):
+        """Adopt thread counts and input size from a benchmark recommendation"""
+        self.inference_config = config
+        if config.get("imgsz"):
+            self.imgsz = int(config["imgsz"])
+            self.realtime_imgsz = int(config["imgsz"])
+        if config.get("intra_op_threads"):
+            torch.set_num_threads(int(config["intra_op_threads"]))
+        if config.get("inter_op_threads"):
+            try:
+                torch.set_num_interop_threads(int(config["inter_op_threads"]))
+            except RuntimeError:
+                # Can only be set once, before any parallel work has started
+                logger.warning("⚠️  inter-op threads already fixed for this process")
+        logger.info("⚙️  Inference config applied", extra={
+            "backend": config.get("backend"),
+            "imgsz": config.get("imgsz"),
+            "intra_op_threads": config.get("intra_op_threads"),
+            "inter_op_threads": config.get("inter_op_threads")
+        })
+    
+    def _weights_for(self, model_path):
+        """Exported weights for ``model_path`` if the config recommends them"""
+        weights = self.inference_config.get("weights")
+        if _same_weights(self.inference_config.get("model"), model_path) and weights and Path(weights).exists():
+            return weights
+        return model_path
+    
+    def _predict_kwargs(self, imgsz=None):
+        imgsz = imgsz or self.imgsz
+        return {"imgsz": imgsz} if imgsz else {}
+
+    def class_names(self):
+        """Class ID -> name map of the active model"""
+        names = getattr(self.models.get(self.active_model_name), "names", None)
+        return dict(names) if names else COCO_NAMES
+
+    def compile_spec(self, spec):
+        """Resolve a DetectionSpec against the active model; ValueError for unknown classes"""
+        key = (self.active_model_name, spec.model_dump_json())
+        compiled = self._compiled_specs.get(key)
+        if compiled is None:
+            if len(self._compiled_specs) > 256:
+                self._compiled_specs.clear()
+            compiled = self._compiled_specs[key] = CompiledSpec(spec, self.class_names())
+        return compiled
+
+    def _class_filter(self, class_spec, conf):
+        """(classes, conf) for the single forward pass: the union of classes at the lowest threshold"""
+        if class_spec is None:
+            return [0], conf  # class 0 = person
+        return class_spec.class_ids, class_spec.min_confidence
         
     async def load_models(self):
         """Load both custom and fallback models"""
-        print("🔄 Loading AI models...")
+        if self.models:
+            # Already loaded, e.g. by serve.py before forking workers
+            return
+        
+        logger.info("🔄 Loading AI models...")
+        
+        if STUB_MODEL_ENABLED:
+            self.models['stub'] = StubModel()
+            self.active_model_name = 'stub'
+            logger.warning("🧪 Stub model active (GUARDX_STUB_MODEL=1) - detections are synthetic")
+            return
+        
+        config = load_inference_config()
+        if config:
+            self._apply_inference_config(config)
         
         # Try to load custom trained model first
         custom_model_path = Path("models/best.pt")
         if custom_model_path.exists():
             try:
-                self.models['custom'] = YOLO(str(custom_model_path))
+                weights = self._weights_for("models/best.pt")
+                self.models['custom'] = YOLO(weights, task="detect")
+                self._model_weights['custom'] = weights
                 self.active_model_name = 'custom'
-                print(f"✅ Custom model loaded: {custom_model_path}")
+                logger.info(f"✅ Custom model loaded: {weights}")
             except Exception as e:
-                print(f"❌ Custom model failed: {e}")
+                logger.error(f"❌ Custom model failed: {e}")
         
         # Load fallback YOLO model
         try:
-            self.models['yolo'] = YOLO('yolov8n.pt')
+            weights = self._weights_for("yolov8n.pt")
+            self.models['yolo'] = YOLO(weights, task="detect")
+            self._model_weights['yolo'] = weights
             if not self.active_model_name:
                 self.active_model_name = 'yolo'
-            print("✅ YOLO fallback model loaded")
+            logger.info(f"✅ YOLO fallback model loaded: {weights}")
         except Exception as e:
-            print(f"❌ YOLO model failed: {e}")
+            logger.error(f"❌ YOLO model failed: {e}")
+        
+        # The benchmark may have recommended the fallback over the custom model
+        preferred = next((name for path, name in MODEL_NAMES.items() if _same_weights(path, config.get("model"))), None)
+        if preferred in self.models:
+            self.active_model_name = preferred
+
+        if config.get("backend", "torch") != "torch" and _same_weights(self._model_weights.get(self.active_model_name), config.get("weights")):
+            # inference_bench.py exports have a static input shape: every call
+            # must use the exported size and batch
+            self.fixed_shape = (int(config["imgsz"]), int(config.get("batch", 1)))
+            logger.info(f"📐 Static export active: imgsz {self.fixed_shape[0]}, batch {self.fixed_shape[1]}")
             
-        print(f"🎯 Active model: {self.active_model_name}")
+        logger.info(f"🎯 Active model: {self.active_model_name}")
     
-    async def detect_humans(self, image, confidence=None):
-        """Enhanced human detection with better accuracy"""
-        print(f"🔄 Starting detection with model: {self.active_model_name}")
-        
+    def _resolve_imgsz(self, inference_spec, default):
+        """Inference size for a policy; a static export always runs at its own size"""
+        if self.fixed_shape is not None:
+            return self.fixed_shape[0]
+        return resolve_imgsz(inference_spec, self.latency, default)
+
+    def _forward(self, model, source, **kwargs):
+        """Model call; static exports get exactly their export batch per call"""
+        if self.fixed_shape is None:
+            return model(source, **kwargs)
+        batch = self.fixed_shape[1]
+        images = source if isinstance(source, list) else [source]
+        results = []
+        for i in range(0, len(images), batch):
+            chunk = images[i:i + batch]
+            # Pad a short chunk by repeating its last image, then drop the extra results
+            results += list(model(chunk + chunk[-1:] * (batch - len(chunk)), **kwargs))[:len(chunk)]
+        return results
+
+    async def _infer(self, model, source, conf, classes, imgsz, pipeline):
+        """One timed forward pass; feeds the per-resolution latency model"""
+        started = time.perf_counter()
+        with stage(pipeline, "inference"):
+            results = await asyncio.to_thread(
+                profiled, self._forward, model, source,
+                conf=conf, classes=classes, verbose=False, **self._predict_kwargs(imgsz)
+            )
+        images = len(source) if isinstance(source, list) else 1
+        self.latency.observe(imgsz or self.imgsz or 640, (time.perf_counter() - started) / images)
+        _record_model_speed(pipeline, results)
+        return results
+
+    async def _refine(self, model, image, detections, conf, classes, inference_spec, pipeline, budget=None):
+        """Re-run low-confidence regions as high-resolution crops; returns (detections, regions)"""
+        height, width = image.shape[:2]
+        regions = refine_regions(
+            detections, width, height, low=detections_floor(conf), high=max(conf, REFINE_CONFIDENT),
+            max_regions=inference_spec.max_regions
+        )
+        regions = [r for r in regions if r[2] - r[0] >= 8 and r[3] - r[1] >= 8]
+        refine_imgsz = self._resolve_imgsz(None, REFINE_IMGSZ)
+        if budget is not None:
+            per_crop = self.latency.estimate(refine_imgsz) or 0.0
+            if per_crop > 0:
+                regions = regions[:max(int(budget // per_crop), 0)]
+        if not regions:
+            return detections, 0
+
+        with stage(pipeline, "refine_crop"):
+            crops = [image[y0:y1, x0:x1] for x0, y0, x1, y1 in regions]
+        # All crops in one call; ultralytics upscales each to the refine size
+        results = await self._infer(model, crops, conf, classes, refine_imgsz, pipeline)
+        with stage(pipeline, "refine_merge"):
+            refined = [
+                Detections.from_result(result).rescale(1.0, x0, y0)
+                for result, (x0, y0, _, _) in zip(results, regions)
+            ]
+            merged = Detections.merge([detections] + refined, iou_threshold=0.5)
+        return merged, len(regions)
+
+    async def detect_humans(self, image, confidence=None, class_spec=None, inference_spec=None):
+        """Enhanced human detection with better accuracy; ``class_spec`` adds per-class rules,
+        ``inference_spec`` picks the resolution and the optional refine pass"""
         if not self.models:
-            print("❌ No models loaded!")
+            logger.error("❌ No models loaded!")
             raise Exception("No models loaded")
             
         if self.active_model_name not in self.models:
-            print(f"❌ Active model {self.active_model_name} not found!")
+            logger.error(f"❌ Active model {self.active_model_name} not found!")
             raise Exception(f"Active model {self.active_model_name} not available")
             
-        conf = confidence or self.confidence_threshold
+        classes, conf = self._class_filter(class_spec, confidence or self.confidence_threshold)
         model = self.models[self.active_model_name]
-        
-        print(f"🎯 Using model: {self.active_model_name}, confidence: {conf}")
+        imgsz = self._resolve_imgsz(inference_spec, self.imgsz)
+        refine = inference_spec is not None and inference_spec.refine
         
         start_time = time.time()
         
         # Convert PIL to numpy array
-        img_array = np.array(image)
-        print(f"📊 Image array shape: {img_array.shape}")
+        with stage("detect", "to_array"):
+            img_array = np.array(image)
         
-        # Run detection
-        print("🤖 Running YOLO detection...")
-        results = model(img_array, conf=conf, classes=[0])  # class 0 = person
-        print(f"📋 YOLO results: {len(results)} result(s)")
+        # Run detection off the event loop so admitted requests overlap.
+        # Refine mode keeps weaker coarse hits as candidate regions.
+        coarse_conf = detections_floor(conf) if refine else conf
+        results = await self._infer(model, img_array, coarse_conf, classes, imgsz, "detect")
         
-        processing_time = time.time() - start_time
+        with stage("detect", "postprocess"):
+            detections = Detections.from_result(results[0]) if len(results) > 0 else Detections.empty()
+
+        refined_regions = 0
+        if refine:
+            budget = None
+            if inference_spec.latency_budget_ms is not None:
+                budget = inference_spec.latency_budget_ms / 1000 - (time.time() - start_time)
+            detections, refined_regions = await self._refine(
+                model, img_array, detections, conf, classes, inference_spec, "detect", budget
+            )
+            detections = detections.filter(detections.scores >= conf)
+
+        if class_spec is not None:
+            detections = class_spec.apply(detections)
         
-        # Extract results
-        boxes = []
-        confidences = []
+        processing_time = time.time() - start_time
         
-        if len(results) > 0 and results[0].boxes is not None:
-            print(f"📦 Found {len(results[0].boxes)} boxes")
-            for i, box in enumerate(results[0].boxes):
-                # Get coordinates (x1, y1, x2, y2)
-                coords = box.xyxy[0].cpu().numpy()
-                confidence = box.conf[0].cpu().numpy()
-                
-                print(f"   Box {i+1}: coords={coords}, conf={confidence}")
-                
-                boxes.append([
-                    float(coords[0]), float(coords[1]), 
-                    float(coords[2]), float(coords[3])
-                ])
-                confidences.append(float(confidence))
-        else:
-            print("📦 No boxes detected")
+        MODEL_INFERENCES.labels(self.active_model_name, "detect").inc()
+        MODEL_DETECTIONS.labels(self.active_model_name, "detect").inc(len(detections))
         
         result = {
-            "boxes": boxes,
-            "count": len(boxes),
-            "confidences": confidences,
+            "detections": detections,
+            "count": len(detections),
             "model_type": self.active_model_name,
             "processing_time": round(processing_time, 3),
-            "confidence_threshold": conf
+            "confidence_threshold": conf,
+            "imgsz": imgsz or 640,
+            "refined_regions": refined_regions,
+            **self._class_summary(detections, class_spec)
         }
         
-        print(f"✅ Final result: {result}")
+        logger.debug("Detection result", extra={
+            "model": self.active_model_name,
+            "confidence_threshold": conf,
+            "shape": list(img_array.shape),
+            "imgsz": imgsz,
+            "refined_regions": refined_regions,
+            "count": len(detections)
+        })
         return result
     
-    async def detect_realtime_frame(self, frame):
-        """Optimized detection for real-time video frames"""
+    def _class_summary(self, detections, class_spec):
+        """Weighted threat score, per-detection weights, per-class counts and the names needed for labels"""
+        if class_spec is None:
+            names = self.class_names()
+            return {
+                "threat_score": float(len(detections)),
+                "weights": np.ones(len(detections), dtype=np.float32),
+                "class_counts": {names.get(0, "person"): len(detections)},
+                "class_names": names
+            }
+        return {
+            "threat_score": class_spec.threat_score(detections),
+            "weights": class_spec.detection_weights(detections),
+            "class_counts": class_spec.class_counts(detections),
+            "class_names": class_spec.names
+        }
+
+    async def detect_realtime_frame(self, frame, roi=None, class_spec=None, inference_spec=None):
+        """Optimized detection for real-time video frames, optionally limited to a stream ROI"""
         if not self.models or self.active_model_name not in self.models:
-            return {"boxes": [], "count": 0, "confidences": []}
+            return {"detections": Detections.empty(), "count": 0}
             
         model = self.models[self.active_model_name]
         
         try:
+            refine = inference_spec is not None and inference_spec.refine
+            budget_start = time.perf_counter()
+            offset_x = offset_y = 0
+            if roi is not None:
+                # Crop to the ROI before resizing: a view, no pixel copy
+                with stage("stream", "roi_crop"):
+                    x0, y0, x1, y1 = roi.crop_rect(frame.shape[1], frame.shape[0])
+                    frame = frame[y0:y1, x0:x1]
+                    offset_x, offset_y = x0, y0
+
             # Resize frame for faster processing
             height, width = frame.shape[:2]
             scale_factor = 1.0
+            source = frame
             
-            if width > 640:
-                scale_factor = 640 / width
-                new_width = 640
-                new_height = int(height * scale_factor)
-                frame = cv2.resize(frame, (new_width, new_height))
+            target_width = self._resolve_imgsz(inference_spec, self.realtime_imgsz)
+            if width > target_width:
+                with stage("stream", "preprocess"):
+                    scale_factor = target_width / width
+                    new_width = target_width
+                    new_height = int(height * scale_factor)
+                    frame = cv2.resize(frame, (new_width, new_height))
+
+            # Small crops are inferred at their own size (rounded to the model
+            # stride) instead of being upscaled to the full inference size
+            imgsz = target_width
+            if roi is not None and self.fixed_shape is None:
+                longest = max(frame.shape[:2])
+                imgsz = min(imgsz, max(32, -(-longest // 32) * 32))
                 
             # Run detection with lower confidence for real-time
-            results = model(frame, conf=0.3, classes=[0], verbose=False)
+            classes, conf = self._class_filter(class_spec, 0.3)
+            coarse_conf = detections_floor(conf) if refine else conf
+            results = await self._infer(model, frame, coarse_conf, classes, imgsz, "stream")
             
-            boxes = []
-            confidences = []
+            with stage("stream", "postprocess"):
+                detections = Detections.from_result(results[0]) if len(results) > 0 else Detections.empty()
+                # Back to (cropped) source coordinates in one array operation
+                detections = detections.rescale(scale_factor)
+
+            if refine:
+                budget = None
+                if inference_spec.latency_budget_ms is not None:
+                    budget = inference_spec.latency_budget_ms / 1000 - (time.perf_counter() - budget_start)
+                # Crops come from the unresized source, so small figures get real pixels
+                detections, _ = await self._refine(
+                    model, source, detections, conf, classes, inference_spec, "stream", budget
+                )
+                detections = detections.filter(detections.scores >= conf)
+
+            with stage("stream", "filter"):
+                if class_spec is not None:
+                    detections = class_spec.apply(detections)
+                detections = detections.rescale(1.0, offset_x, offset_y)
+                if roi is not None and len(detections):
+                    detections = detections.filter(roi.keep_mask(detections.boxes))
             
-            if len(results) > 0 and results[0].boxes is not None:
-                for box in results[0].boxes:
-                    coords = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    
-                    # Scale back to original size if resized
-                    if scale_factor != 1.0:
-                        coords = coords / scale_factor
-                    
-                    boxes.append([
-                        float(coords[0]), float(coords[1]), 
-                        float(coords[2]), float(coords[3])
-                    ])
-                    confidences.append(float(confidence))
+            MODEL_INFERENCES.labels(self.active_model_name, "stream").inc()
+            MODEL_DETECTIONS.labels(self.active_model_name, "stream").inc(len(detections))
             
-            return {
-                "boxes": boxes,
-                "count": len(boxes),
-                "confidences": confidences
-            }
+            return {"detections": detections, "count": len(detections), **self._class_summary(detections, class_spec)}
             
         except Exception as e:
-            print(f"❌ Real-time detection error: {e}")
-            return {"boxes": [], "count": 0, "confidences": []}
+            logger.error(f"❌ Real-time detection error: {e}")
+            return {"detections": Detections.empty(), "count": 0}
     
     async def get_health_status(self):
         """Get model health status"""
@@ -159,6 +407,9 @@ class ModelWrapper:
             "available_models": list(self.models.keys()),
             "device": self.device,
             "confidence_threshold": self.confidence_threshold,
+            "inference_config": self.inference_config or None,
+            "inference_latency_ms": self.latency.snapshot(),
+            "fixed_input_shape": list(self.fixed_shape) if self.fixed_shape else None,
             "models": {
                 name: {
                     "loaded": True,
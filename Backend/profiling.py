@@ -0,0 +1,129 @@
+"""
+On-demand profiling of the live server process.
+
+Disabled unless GUARDX_ENABLE_PROFILING=1. Nothing here runs, hooks or
+imports torch until an admin asks for a capture, so a disabled profiler
+costs nothing.
+
+Both modes return stacks in the collapsed "folded" format
+(``frame;frame;frame count`` per line) that flamegraph.pl, speedscope and
+inferno read directly.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+PROFILING_ENABLED = os.getenv("GUARDX_ENABLE_PROFILING", "0") == "1"
+MAX_PROFILE_SECONDS = 60
+
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a capture is already running"""
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def sample_python_stacks(seconds, interval=0.005):
+    """Sample every thread's Python stack and return folded stacks"""
+    own_ident = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# Folded operator stacks from inference calls while a torch capture runs
+_torch_stacks = None
+# torch allows one active profiler per process
+_torch_lock = threading.Lock()
+
+
+def _torch_activities(torch):
+    from torch.profiler import ProfilerActivity
+
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    return activities
+
+
+def _folded_stacks(prof, torch):
+    metric = "self_cuda_time_total" if torch.cuda.is_available() else "self_cpu_time_total"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stacks.folded")
+        prof.export_stacks(path, metric)
+        return Path(path).read_text()
+
+
+def profiled(fn, *args, **kwargs):
+    """Call ``fn``; while a torch capture runs, record its operators on the calling thread
+
+    The torch profiler only sees operators on the thread that entered it, and
+    inference runs on worker threads, so each model call is profiled where it
+    runs and merged into the capture.
+    """
+    stacks = _torch_stacks
+    if stacks is None:
+        return fn(*args, **kwargs)
+
+    import torch
+    from torch.profiler import profile
+
+    with _torch_lock:
+        with profile(activities=_torch_activities(torch), with_stack=True) as prof:
+            result = fn(*args, **kwargs)
+        for line in _folded_stacks(prof, torch).splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return result
+
+
+def profile_torch_ops(seconds):
+    """Record torch operators of every inference call made during the window, as folded stacks"""
+    global _torch_stacks
+    import torch  # noqa: F401 - fail fast when torch is missing
+
+    _torch_stacks = Counter()
+    try:
+        time.sleep(seconds)
+    finally:
+        with _torch_lock:
+            stacks, _torch_stacks = _torch_stacks, None
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def capture_profile(seconds, mode="python", interval=0.005):
+    """Blocking capture; run it in a worker thread, not on the event loop"""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile capture is already running")
+    try:
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+        if mode == "torch":
+            return profile_torch_ops(seconds)
+        return sample_python_stacks(seconds, interval)
+    finally:
+        _capture_lock.release()
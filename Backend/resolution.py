@@ -0,0 +1,128 @@
+"""
+Adaptive inference resolution.
+
+Callers pick a quality tier or a latency budget instead of an image size.
+Each resolution's inference time is tracked as an EWMA on this host.
+A budget maps to the largest resolution whose measured (or area-scaled)
+latency fits. Sizes never measured are estimated from the nearest one
+that was, assuming cost grows with pixel count, and then corrected by
+real runs.
+
+Refine mode runs a coarse pass, then re-runs only the low-confidence
+regions as crops at high resolution in one batch. It merges both passes
+with NMS.
+"""
+
+import threading
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+
+QUALITY_TIERS = {"fast": 320, "balanced": 640, "high": 960, "max": 1280}
+RESOLUTIONS = tuple(sorted(QUALITY_TIERS.values()))
+REFINE_IMGSZ = 960
+# Coarse hits at or above this are trusted without a second look
+REFINE_CONFIDENT = 0.6
+
+
+class InferenceSpec(BaseModel):
+    quality: Optional[str] = Field(None, pattern="^(fast|balanced|high|max)$")
+    latency_budget_ms: Optional[float] = Field(None, gt=0)
+    # Second pass at high resolution over low-confidence regions only
+    refine: bool = False
+    max_regions: int = Field(8, ge=1, le=32)
+
+    @model_validator(mode="after")
+    def one_policy(self):
+        if self.quality is not None and self.latency_budget_ms is not None:
+            raise ValueError("Use quality or latency_budget_ms, not both")
+        return self
+
+
+class LatencyModel:
+    """Per-resolution inference latency, measured on this host"""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._ewma = {}
+        self._lock = threading.Lock()
+
+    def observe(self, imgsz, seconds):
+        if imgsz not in RESOLUTIONS:
+            # ROI crops run at their own rounded size; those would skew the
+            # area extrapolation for the standard sizes
+            return
+        with self._lock:
+            previous = self._ewma.get(imgsz)
+            self._ewma[imgsz] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, imgsz):
+        """Seconds per image at imgsz, or None before any measurement"""
+        measured = self._ewma.get(imgsz)
+        if measured is not None:
+            return measured
+        if not self._ewma:
+            return None
+        nearest = min(self._ewma, key=lambda size: abs(size - imgsz))
+        return self._ewma[nearest] * (imgsz / nearest) ** 2
+
+    def choose(self, budget_seconds, default=640):
+        """Largest standard resolution expected to fit the budget"""
+        if not self._ewma:
+            # Nothing measured yet: start from the default and learn
+            return default
+        fitting = [size for size in RESOLUTIONS if self.estimate(size) <= budget_seconds]
+        return fitting[-1] if fitting else RESOLUTIONS[0]
+
+    def snapshot(self):
+        return {str(size): round(seconds * 1000, 2) for size, seconds in sorted(self._ewma.items())}
+
+
+def resolve_imgsz(spec, latency, default):
+    """Coarse inference size for a spec (default when no policy is set)"""
+    if spec is None:
+        return default
+    if spec.quality is not None:
+        return QUALITY_TIERS[spec.quality]
+    if spec.latency_budget_ms is not None:
+        budget = spec.latency_budget_ms / 1000
+        if spec.refine:
+            # Leave half the budget for the refine pass
+            budget /= 2
+        return latency.choose(budget, default or 640)
+    return default
+
+
+def detections_floor(conf):
+    """Coarse-pass threshold in refine mode: weaker hits become candidate regions"""
+    return max(conf * 0.5, 0.05)
+
+
+def refine_regions(detections, width, height, low, high, max_regions, margin=0.5):
+    """Expanded, merged crop rectangles around boxes scoring in [low, high)"""
+    uncertain = detections.filter((detections.scores >= low) & (detections.scores < high))
+    if not len(uncertain):
+        return []
+    order = np.argsort(-uncertain.scores, kind="stable")
+    boxes = uncertain.boxes[order].astype(np.float64)
+    pad = np.maximum(boxes[:, 2:] - boxes[:, :2], 16) * margin
+    rects = np.column_stack([boxes[:, :2] - pad, boxes[:, 2:] + pad])
+    rects = np.clip(rects, 0, [width, height, width, height])
+
+    # Greedily fold overlapping rectangles together so each area is inferred once
+    merged = []
+    for rect in rects:
+        for i, other in enumerate(merged):
+            if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                merged[i] = np.concatenate([np.minimum(rect[:2], other[:2]), np.maximum(rect[2:], other[2:])])
+                break
+        else:
+            merged.append(rect)
+        if len(merged) >= max_regions:
+            break
+    return [tuple(int(v) for v in np.round(rect)) for rect in merged]
+
+
+# Active inference policy per stream ID
+stream_inference_specs = {}
@@ -0,0 +1,164 @@
+"""
+Response shapes and serialization for /api/detect.
+
+``legacy`` (default) is the combined military + old format the current
+frontend reads. ``military`` drops the duplicated old-format keys.
+``compact`` is a short-keyed shape meant for machine clients and large
+box counts; it supports field selection and columnar or binary boxes.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RESPONSE_FORMATS = ("legacy", "military", "compact")
+BOX_ENCODINGS = ("nested", "columnar", "binary")
+
+# Top-level keys of the compact format, in output order
+COMPACT_FIELDS = ("v", "op", "ts", "n", "threat", "model", "ms", "conf_thr", "img", "boxes", "scores",
+                  "cls", "counts", "tscore", "imgsz")
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when installed, compact stdlib JSON otherwise"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def parse_fields(fields):
+    """``"n,boxes,scores"`` -> validated tuple, or None for all fields"""
+    if not fields:
+        return None
+    selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in selected if f not in COMPACT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def encode_boxes(detections, box_encoding):
+    """Encode boxes and scores; returns (boxes_value, scores_value)"""
+    boxes, confidences = detections.boxes, detections.scores
+    if box_encoding == "binary":
+        # N x 5 little-endian float32 rows of x1, y1, x2, y2, score
+        table = np.zeros((len(boxes), 5), dtype="<f4")
+        if len(boxes):
+            table[:, :4] = boxes
+            table[:, 4] = confidences
+        return {
+            "dtype": "<f4",
+            "shape": list(table.shape),
+            "columns": ["x1", "y1", "x2", "y2", "score"],
+            "data": base64.b64encode(table.tobytes()).decode("ascii"),
+        }, None
+
+    coords = np.round(boxes.astype(np.float64), 1)
+    scores = np.round(confidences.astype(np.float64), 4).tolist()
+    if box_encoding == "columnar":
+        return {
+            "x1": coords[:, 0].tolist(),
+            "y1": coords[:, 1].tolist(),
+            "x2": coords[:, 2].tolist(),
+            "y2": coords[:, 3].tolist(),
+        }, scores
+    return coords.tolist(), scores
+
+
+def build_compact_response(detection_result, threat_level, image, fields=None, box_encoding="nested"):
+    boxes, scores = encode_boxes(detection_result["detections"], box_encoding)
+    now = datetime.now()
+    response = {
+        "v": 2,
+        "op": f"GUARD-X-{now.strftime('%Y%m%d-%H%M%S')}",
+        "ts": now.isoformat(),
+        "n": detection_result["count"],
+        "threat": threat_level,
+        "model": detection_result["model_type"],
+        "ms": round(detection_result["processing_time"] * 1000, 1),
+        "conf_thr": detection_result["confidence_threshold"],
+        "img": [image.width, image.height],
+        "boxes": boxes,
+    }
+    if scores is not None:
+        response["scores"] = scores
+    response["cls"] = detection_result["detections"].labels(detection_result["class_names"])
+    response["counts"] = detection_result["class_counts"]
+    response["tscore"] = round(detection_result["threat_score"], 3)
+    response["imgsz"] = detection_result["imgsz"]
+    if fields:
+        response = {key: response[key] for key in ("v",) + fields if key in response}
+    return response
+
+
+def build_military_response(detection_result, threat_level, current_user, image, filename):
+    detections = detection_result["detections"]
+    return {
+        "classification": "RESTRICTED",
+        "operation_id": f"GUARD-X-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+        "operator": current_user["username"],
+        "unit": current_user["unit"],
+        "clearance": current_user["clearance_level"],
+        "detection": {
+            "targets_identified": detection_result["count"],
+            "confidence_scores": detections.scores_list(),
+            "bounding_boxes": detections.boxes_list(),
+            "labels": detections.labels(detection_result["class_names"]),
+            "class_counts": detection_result["class_counts"],
+            "threat_score": round(detection_result["threat_score"], 3),
+            "threat_assessment": threat_level,
+            "model_used": detection_result["model_type"],
+            "processing_time": detection_result["processing_time"],
+            "confidence_threshold": detection_result["confidence_threshold"],
+            "inference_size": detection_result["imgsz"],
+            "refined_regions": detection_result["refined_regions"]
+        },
+        "image_metadata": {
+            "filename": filename,
+            "dimensions": f"{image.width}x{image.height}",
+            "format": image.mode
+        },
+        "timestamp": datetime.now().isoformat(),
+        "status": "MISSION_COMPLETE" if detection_result["count"] == 0 else "THREATS_DETECTED",
+    }
+
+
+def build_legacy_response(detection_result, threat_level, current_user, image, filename):
+    # Both old and new format for compatibility
+    response = build_military_response(detection_result, threat_level, current_user, image, filename)
+    detection = response["detection"]
+    response.update({
+        # OLD FORMAT FOR COMPATIBILITY (Frontend expects this)
+        "success": True,
+        "boxes": detection["bounding_boxes"],
+        "count": detection_result["count"],
+        "confidence_scores": detection["confidence_scores"],
+        "model_used": detection_result["model_type"],
+        "processing_time": detection_result["processing_time"],
+        "image_size": {
+            "width": image.width,
+            "height": image.height
+        }
+    })
+    return response
+
+
+def build_detect_response(response_format, detection_result, threat_level, current_user, image, filename,
+                          fields=None, box_encoding="nested"):
+    if response_format == "compact":
+        return build_compact_response(detection_result, threat_level, image, fields, box_encoding)
+    if response_format == "military":
+        return build_military_response(detection_result, threat_level, current_user, image, filename)
+    return build_legacy_response(detection_result, threat_level, current_user, image, filename)
@@ -0,0 +1,65 @@
+"""
+Per-stream regions of interest.
+
+Include polygons limit where detections count; the frame is cropped to
+their bounding rectangle before resize and inference, so a fence line
+that covers a fifth of the frame costs roughly a fifth of the pixels.
+Exclude polygons drop hits (trees, flags, a guard post) after inference.
+All polygons are in full-frame pixel coordinates.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel, field_validator
+
+from geometry import as_polygon, points_in_any, box_anchor_points
+
+
+class StreamROIConfig(BaseModel):
+    include: Optional[List[List[List[float]]]] = None
+    exclude: Optional[List[List[List[float]]]] = None
+    # Pixels of context kept around the include polygons when cropping
+    padding: int = 16
+
+    @field_validator("include", "exclude")
+    @classmethod
+    def check_polygons(cls, value):
+        for polygon in value or []:
+            as_polygon(polygon)
+        return value
+
+
+class StreamROI:
+    def __init__(self, config: StreamROIConfig):
+        self.config = config
+        self.include = [as_polygon(p) for p in config.include or []]
+        self.exclude = [as_polygon(p) for p in config.exclude or []]
+
+    def crop_rect(self, width, height):
+        """Bounding rectangle of the include polygons, padded and clipped: (x0, y0, x1, y1)"""
+        if not self.include:
+            return 0, 0, width, height
+        vertices = np.concatenate(self.include)
+        pad = self.config.padding
+        x0 = int(max(np.floor(vertices[:, 0].min()) - pad, 0))
+        y0 = int(max(np.floor(vertices[:, 1].min()) - pad, 0))
+        x1 = int(min(np.ceil(vertices[:, 0].max()) + pad, width))
+        y1 = int(min(np.ceil(vertices[:, 1].max()) + pad, height))
+        if x1 <= x0 or y1 <= y0:
+            return 0, 0, width, height
+        return x0, y0, x1, y1
+
+    def keep_mask(self, boxes):
+        """True for full-frame boxes whose ground point is inside an ROI and outside every exclusion"""
+        anchors = box_anchor_points(boxes)
+        keep = np.ones(len(anchors), dtype=bool)
+        if self.include:
+            keep &= points_in_any(anchors, self.include)
+        if self.exclude:
+            keep &= ~points_in_any(anchors, self.exclude)
+        return keep
+
+
+# Active ROI per stream ID
+stream_rois = {}
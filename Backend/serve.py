@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Guard-X production launcher
+
+Loads the model weights once in a parent process, then forks N uvicorn
+workers that share those pages copy-on-write and accept on one listening
+socket. Each worker gets its own slice of the CPU for torch threads (and
+optionally a pinned CPU set). The parent watches worker heartbeats and
+replaces workers that exit or hang.
+
+Usage:
+    python serve.py                      # GUARDX_WORKERS workers on $PORT
+    python serve.py --workers 4 --pin-cpus
+
+Use run_server.py for development (single process with auto-reload).
+Camera streams are per worker: run camera ingestion with --workers 1 or
+behind a sticky load balancer.
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger("guardx.serve")
+
+
+def parse_args():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    parser = argparse.ArgumentParser(description="Run Guard-X with preloaded, forked workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("GUARDX_WORKERS", 1)))
+    parser.add_argument("--threads-per-worker", type=int, default=int(os.getenv("GUARDX_THREADS_PER_WORKER", 0)),
+                        help="torch intra-op threads per worker (default: CPUs / workers)")
+    parser.add_argument("--pin-cpus", action="store_true", default=os.getenv("GUARDX_PIN_CPUS", "0") == "1",
+                        help="Pin each worker to its own CPU slice")
+    parser.add_argument("--hang-timeout", type=float, default=float(os.getenv("GUARDX_HANG_TIMEOUT", 60)),
+                        help="Seconds without a heartbeat or finished inference before a worker is replaced")
+    parser.add_argument("--log-level", default=os.getenv("GUARDX_LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+    args.cpus = cpus
+    if args.threads_per_worker <= 0:
+        args.threads_per_worker = max(cpus // max(args.workers, 1), 1)
+    return args
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_cpus(index, args):
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = max(len(cpus) // args.workers, 1)
+    start = (index * per_worker) % len(cpus)
+    return set(cpus[start:start + per_worker])
+
+
+def run_worker(index, sock, heartbeats, args):
+    """Worker body: runs in the forked child and never returns"""
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+
+    if args.pin_cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, worker_cpus(index, args))
+
+    import uvicorn
+    import app as app_module
+    from admission import admission_controller
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(args.threads_per_worker)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+
+    config = uvicorn.Config(app_module.app, log_level=args.log_level, lifespan="on", access_log=False)
+    server = uvicorn.Server(config)
+
+    async def heartbeat():
+        # A blocked event loop or a stuck inference both stop the heartbeat
+        while True:
+            if not admission_controller.is_stalled(args.hang_timeout):
+                heartbeats[index] = time.monotonic()
+            await asyncio.sleep(1.0)
+
+    async def serve():
+        task = asyncio.create_task(heartbeat())
+        try:
+            await server.serve(sockets=[sock])
+        finally:
+            task.cancel()
+
+    logger.info("👷 Worker started", extra={
+        "worker": index,
+        "pid": os.getpid(),
+        "threads": args.threads_per_worker,
+        "cpus": sorted(os.sched_getaffinity(0)) if args.pin_cpus else None
+    })
+    try:
+        asyncio.run(serve())
+    finally:
+        os._exit(0)
+
+
+def spawn_worker(index, sock, heartbeats, args):
+    heartbeats[index] = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        run_worker(index, sock, heartbeats, args)
+    return pid
+
+
+def main():
+    args = parse_args()
+
+    # Thread pools read these once at import; set before torch is loaded
+    os.environ.setdefault("OMP_NUM_THREADS", str(args.threads_per_worker))
+    os.environ.setdefault("MKL_NUM_THREADS", str(args.threads_per_worker))
+
+    import app as app_module
+
+    logger.info("🎖️  GUARD-X PRODUCTION LAUNCHER", extra={
+        "workers": args.workers,
+        "threads_per_worker": args.threads_per_worker,
+        "cpus": args.cpus
+    })
+
+    # Load weights once, without running inference, so no thread pools exist at fork
+    asyncio.run(app_module.model_wrapper.load_models())
+
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    heartbeats = multiprocessing.Array("d", args.workers, lock=False)
+    workers = {}
+    started_at = {}
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for index in range(args.workers):
+        pid = spawn_worker(index, sock, heartbeats, args)
+        workers[pid] = index
+        started_at[index] = time.monotonic()
+
+    logger.info(f"✅ Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+
+    while not stopping:
+        time.sleep(1.0)
+
+        # Reap exited workers
+        while workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            index = workers.pop(pid, None)
+            if index is None or stopping:
+                continue
+            logger.error("❌ Worker exited, restarting", extra={"worker": index, "pid": pid, "status": status})
+            if time.monotonic() - started_at[index] < 5:
+                # Crash loop guard
+                time.sleep(1.0)
+            new_pid = spawn_worker(index, sock, heartbeats, args)
+            workers[new_pid] = index
+            started_at[index] = time.monotonic()
+
+        # Kill hung workers; they are replaced on the next reap
+        now = time.monotonic()
+        for pid, index in list(workers.items()):
+            if now - heartbeats[index] > args.hang_timeout:
+                logger.error("❌ Worker hung, killing", extra={"worker": index, "pid": pid})
+                heartbeats[index] = now
+                os.kill(pid, signal.SIGKILL)
+
+    logger.info("🛑 Stopping workers...")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + 30
+    while workers and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        workers.pop(pid, None)
+    for pid in workers:
+        os.kill(pid, signal.SIGKILL)
+    sock.close()
+    logger.info("✅ Guard-X stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+On-disk naming shared by the evidence and sortie stores.
+"""
+
+import re
+
+# IDs and folder names built from stream IDs only ever contain these
+SAFE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def safe_name(stream_id, limit=40):
+    """Stream IDs can be device indexes, URLs or file paths; keep a filesystem-safe tail"""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(stream_id))[-limit:] or "stream"
@@ -0,0 +1,122 @@
+"""
+Stub detector for benchmarking without torch.
+
+Enabled with GUARDX_STUB_MODEL=1. It mimics the parts of the ultralytics
+result API that ModelWrapper reads, so the HTTP, encode and WebSocket
+fan-out paths run unchanged while the model cost is replaced by a fixed,
+configurable delay.
+"""
+
+import os
+import time
+
+import numpy as np
+
+STUB_MODEL_ENABLED = os.getenv("GUARDX_STUB_MODEL", "0") == "1"
+
+
+def _read_image(path):
+    import cv2
+
+    image = cv2.imread(os.fspath(path))
+    if image is None:
+        raise FileNotFoundError(f"Image not found or unreadable: {path}")
+    return image
+
+
+class _StubTensor:
+    """Minimal stand-in for a torch tensor: indexable, ``.cpu().numpy()``"""
+
+    def __init__(self, array):
+        self._array = array
+
+    def __getitem__(self, index):
+        return _StubTensor(self._array[index])
+
+    def __len__(self):
+        return len(self._array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+    def tolist(self):
+        return self._array.tolist()
+
+    def __float__(self):
+        return float(self._array)
+
+    def __int__(self):
+        return int(self._array)
+
+
+class _StubBox:
+    def __init__(self, row):
+        self.xyxy = _StubTensor(row[None, :4])
+        self.conf = _StubTensor(row[None, 4])
+        self.cls = _StubTensor(row[None, 5])
+
+
+class _StubBoxes:
+    def __init__(self, data):
+        # Same column layout as ultralytics Boxes.data: x1, y1, x2, y2, conf, cls
+        self.data = _StubTensor(data)
+        self.xyxy = _StubTensor(data[:, :4])
+        self.conf = _StubTensor(data[:, 4])
+        self.cls = _StubTensor(data[:, 5])
+        self.id = None
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return (_StubBox(row) for row in self.data.numpy())
+
+
+class _StubResult:
+    def __init__(self, boxes, speed):
+        self.boxes = boxes
+        self.speed = speed
+
+
+class StubModel:
+    """Returns ``num_boxes`` deterministic person boxes after ``latency_ms``"""
+
+    def __init__(self, num_boxes=None, latency_ms=None):
+        self.num_boxes = num_boxes if num_boxes is not None else int(os.getenv("GUARDX_STUB_BOXES", 3))
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("GUARDX_STUB_LATENCY_MS", 0))
+
+    def _boxes_for(self, height, width, conf, classes):
+        # Boxes laid out left to right, each a tall person-shaped rectangle
+        n = self.num_boxes
+        if n == 0 or (classes is not None and len(classes) == 0):
+            return np.zeros((0, 6), dtype=np.float32)
+        slot = width / n
+        x1 = np.arange(n, dtype=np.float32) * slot + slot * 0.25
+        data = np.empty((n, 6), dtype=np.float32)
+        data[:, 0] = x1
+        data[:, 1] = height * 0.3
+        data[:, 2] = x1 + slot * 0.5
+        data[:, 3] = height * 0.9
+        data[:, 4] = np.linspace(0.95, 0.55, n, dtype=np.float32)
+        # Requested classes take turns, so multi-class paths see every class
+        data[:, 5] = np.resize(np.asarray(classes if classes is not None else [0], dtype=np.float32), n)
+        return data[data[:, 4] >= (conf or 0.0)]
+
+    def __call__(self, source, conf=0.25, classes=None, verbose=True, **kwargs):
+        start = time.perf_counter()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        images = source if isinstance(source, list) else [source]
+        results = []
+        for image in images:
+            if isinstance(image, (str, os.PathLike)):
+                # ultralytics accepts file paths too
+                image = _read_image(image)
+            height, width = np.asarray(image).shape[:2]
+            data = self._boxes_for(height, width, conf, classes)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results.append(_StubResult(_StubBoxes(data), {"preprocess": 0.0, "inference": elapsed_ms, "postprocess": 0.0}))
+        return results
@@ -0,0 +1,436 @@
+"""
+Per-stream telemetry: GPS, altitude and heading at high rate.
+
+Samples go into a fixed-size numpy ring buffer per stream. A frame's
+position is interpolated between the two samples around its capture
+time, found with ``np.searchsorted`` (O(log n) however long the sortie).
+Heading is interpolated along the shorter arc, so 350 -> 10 passes
+through 0, not 180.
+
+While a stream runs, every sample and every detected frame's position is
+also logged for the sortie. When the stream stops, the sortie is written
+to one compressed ``.npz`` with delta-encoded integer columns:
+milliseconds, 1e-7 degrees, centimetres and centidegrees. Sorties can be
+replayed and queried by bounding box and time range.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from storage import SAFE_ID, safe_name
+
+logger = logging.getLogger("guardx.telemetry")
+
+SORTIE_DIR = Path(os.getenv("GUARDX_SORTIE_DIR", "sorties"))
+
+# Row layout shared by the ring buffer and the sortie logs
+TRACK_COLUMNS = ("t", "lat", "lon", "alt", "hdg")
+DETECTION_COLUMNS = ("t", "lat", "lon", "alt", "hdg", "count", "threat_score")
+
+# Fixed-point scales for the on-disk format
+_SCALES = {"t": 1000, "lat": 1e7, "lon": 1e7, "alt": 100, "hdg": 100, "count": 1, "threat_score": 1000}
+
+
+class TelemetrySample(BaseModel):
+    t: Optional[float] = None  # epoch seconds; receive time when omitted
+    lat: float
+    lon: float
+    alt: float = 0.0
+    hdg: float = 0.0
+
+
+class TelemetryBatch(BaseModel):
+    """A list of samples, or columns of equal length (compact for high rates)"""
+    samples: Union[List[TelemetrySample], dict]
+
+
+def samples_to_array(samples, received_at=None):
+    """List of sample dicts, or a dict of columns -> (N, 5) float64 array sorted by t"""
+    received_at = received_at if received_at is not None else time.time()
+    if isinstance(samples, dict):
+        n = len(samples["lat"])
+        t = samples.get("t")
+        rows = np.column_stack([
+            np.asarray(t, dtype=np.float64) if t is not None else np.full(n, received_at),
+            np.asarray(samples["lat"], dtype=np.float64),
+            np.asarray(samples["lon"], dtype=np.float64),
+            np.asarray(samples.get("alt", np.zeros(n)), dtype=np.float64),
+            np.asarray(samples.get("hdg", np.zeros(n)), dtype=np.float64),
+        ])
+    else:
+        rows = np.array([
+            (
+                s.get("t") if s.get("t") is not None else received_at,
+                s["lat"], s["lon"], s.get("alt", 0.0), s.get("hdg", 0.0),
+            )
+            for s in (sample if isinstance(sample, dict) else sample.model_dump() for sample in samples)
+        ], dtype=np.float64).reshape(-1, 5)
+    rows[:, 4] %= 360.0
+    if len(rows) > 1:
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    return rows
+
+
+def _interpolate(before, after, t):
+    """Linear interpolation between two (5,) rows; heading along the shorter arc"""
+    span = after[0] - before[0]
+    f = 0.0 if span <= 0 else (t - before[0]) / span
+    row = before + (after - before) * f
+    turn = ((after[4] - before[4] + 180.0) % 360.0) - 180.0
+    row[4] = (before[4] + turn * f) % 360.0
+    return row
+
+
+class TelemetryBuffer:
+    """Fixed-capacity ring of samples in time order"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._rows = np.empty((capacity, 5), dtype=np.float64)
+        self._start = 0
+        self.size = 0
+        self.rejected = 0
+
+    @property
+    def last_t(self):
+        return self._rows[(self._start + self.size - 1) % self.capacity, 0] if self.size else -np.inf
+
+    def extend(self, rows):
+        """Append rows sorted by t; rows not newer than the last sample are dropped"""
+        fresh = rows[rows[:, 0] > self.last_t]
+        if len(fresh) > 1:
+            # Duplicate timestamps inside the batch would make interpolation divide by zero
+            fresh = fresh[np.concatenate(([True], np.diff(fresh[:, 0]) > 0))]
+        self.rejected += len(rows) - len(fresh)
+        if len(fresh) > self.capacity:
+            fresh = fresh[-self.capacity:]
+        n = len(fresh)
+        if n == 0:
+            return fresh
+
+        end = (self._start + self.size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._rows[end:end + first] = fresh[:first]
+        self._rows[:n - first] = fresh[first:]
+
+        overflow = max(self.size + n - self.capacity, 0)
+        self._start = (self._start + overflow) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return fresh
+
+    def _segments(self):
+        # The ring is at most two contiguous, time-ordered slices
+        end = self._start + self.size
+        if end <= self.capacity:
+            return [self._rows[self._start:end]]
+        return [self._rows[self._start:], self._rows[:end - self.capacity]]
+
+    def ordered(self):
+        """Copy of all rows, oldest first"""
+        return np.concatenate(self._segments()) if self.size else np.empty((0, 5))
+
+    def _row(self, index):
+        return self._rows[(self._start + index) % self.capacity]
+
+    def _search(self, t):
+        """Logical index of the first sample with time > t (binary search over the ring)"""
+        segments = self._segments()
+        if len(segments) == 2 and t >= segments[1][0, 0]:
+            return len(segments[0]) + int(np.searchsorted(segments[1][:, 0], t, side="right"))
+        return int(np.searchsorted(segments[0][:, 0], t, side="right"))
+
+    def position_at(self, t, max_gap=2.0):
+        """Interpolated (5,) row at time t, or None if no sample is within max_gap seconds"""
+        if not self.size:
+            return None
+        i = self._search(t)
+        if i == 0:
+            first = self._row(0)
+            return first.copy() if first[0] - t <= max_gap else None
+        if i == self.size:
+            last = self._row(self.size - 1)
+            return last.copy() if t - last[0] <= max_gap else None
+        before, after = self._row(i - 1), self._row(i)
+        if after[0] - before[0] > 2 * max_gap:
+            # Link dropout: do not invent a straight line across it
+            nearest = before if t - before[0] <= after[0] - t else after
+            return nearest.copy() if abs(nearest[0] - t) <= max_gap else None
+        return _interpolate(before, after, t)
+
+
+class _ColumnLog:
+    """Append-only rows in fixed-size chunks, so hours of samples never reallocate"""
+
+    def __init__(self, width, chunk_rows=4096):
+        self.width = width
+        self.chunk_rows = chunk_rows
+        self._chunks = []
+        self._fill = chunk_rows
+        self.size = 0
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.width)
+        while len(rows):
+            if self._fill == self.chunk_rows:
+                self._chunks.append(np.empty((self.chunk_rows, self.width), dtype=np.float64))
+                self._fill = 0
+            take = min(len(rows), self.chunk_rows - self._fill)
+            self._chunks[-1][self._fill:self._fill + take] = rows[:take]
+            self._fill += take
+            self.size += take
+            rows = rows[take:]
+
+    def to_array(self):
+        if not self._chunks:
+            return np.empty((0, self.width))
+        return np.concatenate(self._chunks[:-1] + [self._chunks[-1][:self._fill]])
+
+
+def encode_columns(rows, columns):
+    """(N, C) float rows -> {column: first value + int deltas} (integer fixed point)"""
+    encoded = {}
+    for i, name in enumerate(columns):
+        fixed = np.round(rows[:, i] * _SCALES[name]).astype(np.int64)
+        if name == "hdg":
+            # Heading deltas wrap into [-18000, 18000)
+            deltas = (np.diff(fixed) + 18000) % 36000 - 18000
+        else:
+            deltas = np.diff(fixed)
+        dtype = np.int32 if len(deltas) == 0 or np.abs(deltas).max() < 2**31 else np.int64
+        encoded[f"{name}_base"] = fixed[:1]
+        encoded[f"{name}_delta"] = deltas.astype(dtype)
+    return encoded
+
+
+def decode_columns(data, columns, prefix=""):
+    """Inverse of encode_columns -> (N, C) float64 rows"""
+    out = []
+    for name in columns:
+        base = data[f"{prefix}{name}_base"].astype(np.int64)
+        if len(base) == 0:
+            return np.empty((0, len(columns)))
+        fixed = np.concatenate([base, base[0] + np.cumsum(data[f"{prefix}{name}_delta"].astype(np.int64))])
+        if name == "hdg":
+            fixed %= 36000
+        out.append(fixed / _SCALES[name])
+    return np.column_stack(out)
+
+
+class _Sortie:
+    def __init__(self, stream_id):
+        self.stream_id = stream_id
+        self.started_at = time.time()
+        self.track = _ColumnLog(len(TRACK_COLUMNS))
+        self.detections = _ColumnLog(len(DETECTION_COLUMNS))
+
+
+class TelemetryStore:
+    def __init__(self, root=SORTIE_DIR, capacity=None, max_gap=None):
+        self.root = Path(root)
+        # Default: one hour at 10 Hz per stream
+        self.capacity = capacity or int(os.getenv("GUARDX_TELEMETRY_CAPACITY", 36000))
+        # Seconds a frame may be from the nearest sample and still get a position
+        self.max_gap = max_gap if max_gap is not None else float(os.getenv("GUARDX_TELEMETRY_MAX_GAP", 2.0))
+        self._buffers = {}
+        self._sorties = {}
+        self._lock = threading.Lock()
+
+    # Ingest and lookup
+
+    def ingest(self, stream_id, samples, received_at=None):
+        """Add samples (list of dicts or dict of columns); returns the number accepted"""
+        rows = samples_to_array(samples, received_at)
+        with self._lock:
+            buffer = self._buffers.get(stream_id)
+            if buffer is None:
+                buffer = self._buffers[stream_id] = TelemetryBuffer(self.capacity)
+            accepted = buffer.extend(rows)
+            sortie = self._sorties.get(stream_id)
+            if sortie is not None and len(accepted):
+                sortie.track.extend(accepted)
+        return len(accepted)
+
+    def position_at(self, stream_id, t):
+        """Interpolated position as a gps_location dict, or None"""
+        buffer = self._buffers.get(stream_id)
+        if buffer is None:
+            return None
+        with self._lock:
+            row = buffer.position_at(t, self.max_gap)
+        if row is None:
+            return None
+        return {
+            "latitude": float(row[1]),
+            "longitude": float(row[2]),
+            "altitude": float(row[3]),
+            "heading": float(row[4]),
+            "timestamp": t,
+            "source": "telemetry",
+        }
+
+    def get_status(self, stream_id):
+        buffer = self._buffers.get(stream_id)
+        if buffer is None:
+            return None
+        return {
+            "samples": buffer.size,
+            "capacity": buffer.capacity,
+            "rejected": buffer.rejected,
+            "last_sample": float(buffer.last_t) if buffer.size else None,
+            "recording": stream_id in self._sorties,
+        }
+
+    # Sortie recording
+
+    def start_sortie(self, stream_id):
+        with self._lock:
+            sortie = self._sorties[stream_id] = _Sortie(stream_id)
+            buffer = self._buffers.get(stream_id)
+            if buffer is not None:
+                # Feeds usually connect before the camera; keep what is already buffered
+                sortie.track.extend(buffer.ordered())
+
+    def record_detection(self, stream_id, t, position, count, threat_score):
+        """Log a detection at capture time t; position may be telemetry or a static location"""
+        sortie = self._sorties.get(stream_id)
+        if sortie is None or position is None:
+            return
+        sortie.detections.extend([
+            t, position["latitude"], position["longitude"],
+            position.get("altitude", 0.0), position.get("heading", 0.0), count, threat_score,
+        ])
+
+    def stop_sortie(self, stream_id):
+        """Write the sortie to disk (blocking; call from a thread). Returns its ID or None."""
+        with self._lock:
+            sortie = self._sorties.pop(stream_id, None)
+        if sortie is None or sortie.track.size == 0:
+            return None
+        track = sortie.track.to_array()
+        detections = sortie.detections.to_array()
+        started = datetime.fromtimestamp(sortie.started_at)
+        sortie_id = f"{safe_name(stream_id)}-{started.strftime('%Y%m%d-%H%M%S')}-{started.microsecond // 1000:03d}"
+        meta = {
+            "sortie_id": sortie_id,
+            "stream_id": stream_id,
+            "start": float(track[0, 0]),
+            "end": float(track[-1, 0]),
+            "samples": len(track),
+            "detections": len(detections),
+            "bbox": [float(track[:, 2].min()), float(track[:, 1].min()),
+                     float(track[:, 2].max()), float(track[:, 1].max())],
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / f"{sortie_id}.npz"
+        suffix = 1
+        while path.exists():
+            # Same stream restarted within the same millisecond
+            suffix += 1
+            path = self.root / f"{sortie_id}-{suffix}.npz"
+        sortie_id = meta["sortie_id"] = path.stem
+        tmp_path = self.root / f"{sortie_id}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(json.dumps(meta)),
+            **encode_columns(track, TRACK_COLUMNS),
+            **{f"det_{k}": v for k, v in encode_columns(detections, DETECTION_COLUMNS).items()},
+        )
+        os.replace(tmp_path, path)
+        logger.info(f"💾 Sortie saved: {sortie_id}", extra={
+            "samples": meta["samples"],
+            "detections": meta["detections"],
+            "bytes": path.stat().st_size
+        })
+        return sortie_id
+
+    # Replay and geo-queries
+
+    def list_sorties(self):
+        sorties = []
+        for path in sorted(self.root.glob("*.npz")):
+            if path.name.endswith(".tmp.npz"):
+                continue
+            with np.load(path) as data:
+                sorties.append(json.loads(str(data["meta"])))
+        return sorties
+
+    def load_sortie(self, sortie_id):
+        """(meta, track rows, detection rows) or None"""
+        if not SAFE_ID.fullmatch(sortie_id):
+            return None
+        path = self.root / f"{sortie_id}.npz"
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            track = decode_columns(data, TRACK_COLUMNS)
+            detections = decode_columns(data, DETECTION_COLUMNS, prefix="det_")
+        return meta, track, detections
+
+    def query(self, bbox=None, since=None, until=None):
+        """Track time spans and detections inside a lon/lat bbox and time range, per sortie"""
+        results = []
+        for meta in self.list_sorties():
+            if since is not None and meta["end"] < since or until is not None and meta["start"] > until:
+                continue
+            if bbox is not None and not _bbox_overlaps(meta["bbox"], bbox):
+                continue
+            loaded = self.load_sortie(meta["sortie_id"])
+            if loaded is None:
+                # Removed since it was listed
+                continue
+            _, track, detections = loaded
+            track_mask = _mask(track, bbox, since, until)
+            detection_mask = _mask(detections, bbox, since, until)
+            if not track_mask.any() and not detection_mask.any():
+                continue
+            results.append({
+                "sortie_id": meta["sortie_id"],
+                "stream_id": meta["stream_id"],
+                "spans": _spans(track[track_mask, 0], gap=max(self.max_gap, 1.0)),
+                "detections": rows_to_dicts(detections[detection_mask], DETECTION_COLUMNS),
+            })
+        return results
+
+
+def _bbox_overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _mask(rows, bbox, since, until):
+    mask = np.ones(len(rows), dtype=bool)
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        mask &= (rows[:, 2] >= min_lon) & (rows[:, 2] <= max_lon) & (rows[:, 1] >= min_lat) & (rows[:, 1] <= max_lat)
+    if since is not None:
+        mask &= rows[:, 0] >= since
+    if until is not None:
+        mask &= rows[:, 0] < until
+    return mask
+
+
+def _spans(times, gap):
+    """Sorted timestamps -> [[start, end], ...] split where samples are more than gap apart"""
+    if len(times) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(times) > gap)
+    starts = np.concatenate(([times[0]], times[breaks + 1]))
+    ends = np.concatenate((times[breaks], [times[-1]]))
+    return np.column_stack([starts, ends]).tolist()
+
+
+def rows_to_dicts(rows, columns):
+    return [dict(zip(columns, row)) for row in rows.tolist()]
+
+
+# Global telemetry store shared by all streams
+telemetry_store = TelemetryStore()
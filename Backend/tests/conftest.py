@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# Backend modules are flat and imported by name, as app.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# No model weights in tests: anything that needs a model gets the stub
+os.environ.setdefault("GUARDX_STUB_MODEL", "1")
+os.environ.setdefault("GUARDX_EVIDENCE_ENABLED", "0")
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, resolve_priority
+
+
+async def _queue(controller, order, name, priority, deadline=5.0):
+    try:
+        await controller.acquire(priority, deadline)
+    except AdmissionRejected as e:
+        order.append((name, e.reason))
+        return
+    order.append((name, "admitted"))
+    controller.release(0.01)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=8)
+        await controller.acquire("normal")
+        order = []
+        tasks = [
+            asyncio.create_task(_queue(controller, order, name, priority))
+            for name, priority in [("batch", "batch"), ("normal-1", "normal"), ("high", "high"),
+                                   ("normal-2", "normal"), ("live", "live")]
+        ]
+        await asyncio.sleep(0)
+        assert controller.queued == 5
+        controller.release(0.01)
+        await asyncio.gather(*tasks)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert [name for name, _ in order] == ["live", "high", "normal-1", "normal-2", "batch"]
+    assert controller.queued == 0 and controller.in_flight == 0
+    assert controller.admitted == 6
+
+
+def test_full_queue_sheds_lower_priority_waiter():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1)
+        await controller.acquire("normal")
+        order = []
+        batch = asyncio.create_task(_queue(controller, order, "batch", "batch"))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(_queue(controller, order, "high", "high"))
+        await asyncio.sleep(0)
+        # Same or higher rank than every waiter: nothing to shed
+        with pytest.raises(AdmissionRejected, match="QUEUE FULL"):
+            await controller.acquire("batch")
+        controller.release(0.01)
+        await asyncio.gather(batch, high)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert order == [("batch", "PREEMPTED BY HIGHER PRIORITY WORK"), ("high", "admitted")]
+    assert controller.queued == 0 and controller.rejected == 2
+
+
+def test_estimated_wait_beyond_deadline_is_rejected_up_front():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1)
+        controller.service_time = 1.0
+        await controller.acquire("normal")
+        with pytest.raises(AdmissionRejected) as raised:
+            await controller.acquire("normal", deadline=0.5)
+        return controller, raised.value
+
+    controller, error = asyncio.run(scenario())
+    assert error.reason == "ESTIMATED QUEUE WAIT EXCEEDS DEADLINE"
+    assert error.retry_after == 1
+    assert controller.queued == 0
+
+
+def test_expired_waiters_are_dropped_and_counted_once():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1)
+        controller.service_time = 0.01
+        await controller.acquire("normal")
+        order = []
+        waiters = [asyncio.create_task(_queue(controller, order, f"w{i}", "normal", deadline=0.05))
+                   for i in range(3)]
+        await asyncio.sleep(0.1)
+        controller.release(0.01)
+        await asyncio.gather(*waiters)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert {reason for _, reason in order} == {"REQUEST DEADLINE EXCEEDED IN QUEUE"}
+    assert controller.expired == 3
+    assert controller.queued == 0 and controller.in_flight == 0
+
+
+def test_resolve_priority_respects_clearance():
+    secret = {"clearance_level": "SECRET"}
+    top_secret = {"clearance_level": "TOP_SECRET"}
+    assert resolve_priority(None, secret) == "normal"
+    assert resolve_priority("high", secret) == "normal"
+    assert resolve_priority("high", top_secret) == "high"
+    assert resolve_priority("batch", top_secret) == "batch"
+    assert resolve_priority("live", secret) == "normal"
+
+
+def test_precheck_matches_acquire_without_taking_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1)
+        controller.precheck("normal")
+        await controller.acquire("normal")
+        batch = asyncio.create_task(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        # A batch waiter can still be preempted by normal work, not by batch
+        controller.precheck("normal")
+        with pytest.raises(AdmissionRejected, match="QUEUE FULL"):
+            controller.precheck("batch")
+        controller.service_time = 10.0
+        with pytest.raises(AdmissionRejected, match="EXCEEDS DEADLINE"):
+            controller.precheck("normal", deadline=1.0)
+        state = (controller.in_flight, controller.queued, controller.rejected)
+        controller.release(0.01)
+        await batch
+        return state
+
+    assert asyncio.run(scenario()) == (1, 1, 2)
+
+
+def test_detect_is_shed_before_the_upload_is_parsed(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from admission import admission_controller
+    from auth import ARMY_USERS, create_access_token
+
+    monkeypatch.setattr(admission_controller, "in_flight", admission_controller.max_in_flight)
+    monkeypatch.setattr(admission_controller, "queued", admission_controller.max_queue)
+    token = create_access_token({"sub": ARMY_USERS["operator"]["username"]})
+    # Not an image: the handler would answer 400, so a 503 proves it never ran
+    response = TestClient(app).post(
+        "/api/detect", files={"file": ("notes.txt", b"x" * 1024, "text/plain")},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 503
+    assert response.json()["detail"] == "SYSTEM AT CAPACITY - DETECTION QUEUE FULL"
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from batch_scan import JsonlWriter, ParquetWriter
+from yolo_model import YOLOHumanDetector
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def write_images(folder, count):
+    folder.mkdir()
+    paths = []
+    for i in range(count):
+        path = folder / f"img{i:02d}.jpg"
+        cv2.imwrite(str(path), np.full((60, 80, 3), i * 10, dtype=np.uint8))
+        paths.append(str(path))
+    return paths
+
+
+def scan(*args):
+    env = dict(os.environ, GUARDX_STUB_MODEL="1", GUARDX_LOG_LEVEL="WARNING")
+    subprocess.run([sys.executable, "batch_scan.py", *map(str, args)], cwd=BACKEND_DIR, env=env, check=True)
+
+
+def test_detect_humans_reads_image_paths(tmp_path):
+    path = write_images(tmp_path / "images", 1)[0]
+    boxes = YOLOHumanDetector().detect_humans(path)
+    assert len(boxes) == 3 and all(len(box) == 4 for box in boxes)
+    with pytest.raises(FileNotFoundError):
+        YOLOHumanDetector().detect_humans(str(tmp_path / "missing.jpg"))
+
+
+def test_jsonl_resume_drops_a_partial_last_line(tmp_path):
+    out = tmp_path / "scan.jsonl"
+    out.write_bytes(b'{"path":"a.jpg"}\n{"path":"b.jpg"}\n{"path":"c.j')
+    writer = JsonlWriter(out)
+    assert writer.scanned_paths() == {"a.jpg", "b.jpg"}
+    assert out.read_bytes() == b'{"path":"a.jpg"}\n{"path":"b.jpg"}\n'
+    writer.open()
+    writer.write([{"path": "c.jpg"}])
+    writer.close()
+    assert JsonlWriter(out).scanned_paths() == {"a.jpg", "b.jpg", "c.jpg"}
+
+
+def test_interrupted_jsonl_scan_resumes_without_duplicates(tmp_path):
+    paths = write_images(tmp_path / "images", 7)
+    out = tmp_path / "scan.jsonl"
+    scan(tmp_path / "images", "--out", out, "--batch", "3", "--decode-workers", "2")
+    lines = out.read_bytes().splitlines(keepends=True)
+    # Crash mid-write: three whole records and half of the fourth
+    out.write_bytes(b"".join(lines[:3]) + lines[3][:10])
+
+    scan(tmp_path / "images", "--out", out, "--batch", "3", "--decode-workers", "2")
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["path"] for r in records) == sorted(paths)
+    assert all(r["count"] == 3 and r["error"] is None for r in records)
+
+
+def test_parquet_resume_only_trusts_flushed_parts(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "parts"
+    record = {"width": 80, "height": 60, "count": 0, "boxes": [], "confidences": [], "error": None}
+    writer = ParquetWriter(out, part_rows=2, flush_seconds=3600)
+    writer.open()
+    writer.write([dict(record, path=p) for p in ("a", "b", "c")])
+    # A crash before close: "c" was never flushed, and a half-written part is left behind
+    (out / "part-00001.parquet.tmp").write_bytes(b"partial")
+
+    resumed = ParquetWriter(out, part_rows=2, flush_seconds=3600)
+    assert resumed.scanned_paths() == {"a", "b"}
+    resumed.open()
+    resumed.write([dict(record, path="c")])
+    resumed.close()
+    assert [p.name for p in resumed._parts()] == ["part-00000.parquet", "part-00001.parquet"]
+    assert pq.read_table(out / "part-00001.parquet").column("path").to_pylist() == ["c"]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from auth import ARMY_USERS, create_access_token
+from camera_detection import CameraManager, router
+from model_wrapper import ModelWrapper
+from telemetry import telemetry_store
+from threat_events import GpsLocation
+
+
+class FrameSource:
+    """cv2.VideoCapture stand-in that yields ``frames`` blank frames, then fails"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def read(self):
+        if self.frames == 0:
+            return False, None
+        self.frames -= 1
+        return True, np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+class Client:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+
+def test_static_gps_stream_survives_detections():
+    # No telemetry feed: frames fall back to the start_camera GPS, which has no timestamp
+    async def scenario():
+        wrapper = ModelWrapper()
+        await wrapper.load_models()
+        manager = CameraManager(wrapper)
+        manager.gps_location = GpsLocation(latitude=10.0, longitude=20.0).model_dump(exclude_none=True)
+        manager.camera = FrameSource(7)
+        manager.stream_id = "static-gps-test"
+        manager.is_streaming = True
+        client = Client()
+        manager.active_connections.append(client)
+        telemetry_store.start_sortie(manager.stream_id)
+        try:
+            await manager.stream_detection()
+            return client.messages, telemetry_store._sorties[manager.stream_id].detections.to_array()
+        finally:
+            telemetry_store._sorties.pop(manager.stream_id, None)
+
+    messages, detections = asyncio.run(scenario())
+    assert len(messages) == 7
+    assert [m["detections"]["count"] > 0 for m in messages] == [False, False, True, False, False, True, False]
+    assert all(m["gps_location"]["latitude"] == 10.0 for m in messages)
+    # Both detected frames are logged against the static position
+    assert detections.shape[0] == 2
+    assert detections[:, 1:3].tolist() == [[10.0, 20.0], [10.0, 20.0]]
+
+
+def test_telemetry_socket_requires_secret_clearance():
+    app = FastAPI()
+    app.include_router(router, prefix="/camera")
+    client = TestClient(app)
+    with pytest.raises(WebSocketDisconnect) as rejected:
+        with client.websocket_connect("/camera/ws/telemetry?stream_id=auth-test&token=bogus"):
+            pass
+    assert rejected.value.code == 1008
+
+    token = create_access_token({"sub": ARMY_USERS["operator"]["username"]})
+    with client.websocket_connect(f"/camera/ws/telemetry?stream_id=auth-test&token={token}") as ws:
+        ws.send_text(json.dumps({"t": 100.0, "lat": 10.0, "lon": 20.0}))
+    assert telemetry_store.position_at("auth-test", 100.0)["latitude"] == 10.0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from detection_classes import COCO_NAMES, CompiledSpec, assess_threat, parse_class_spec
+from detections import Detections
+
+
+def test_parse_class_spec_fills_defaults():
+    spec = parse_class_spec("person:0.4:1, car::2,backpack", default_confidence=0.3)
+    rules = [(r.name, r.confidence, r.weight) for r in spec.classes]
+    assert rules == [("person", 0.4, 1.0), ("car", 0.3, 2.0), ("backpack", 0.3, 1.0)]
+
+
+def test_parse_class_spec_rejects_bad_rules():
+    with pytest.raises(ValueError):
+        parse_class_spec("person:0.5:1:9")
+    with pytest.raises(ValueError):
+        parse_class_spec("person:1.5")
+    with pytest.raises(ValueError):
+        parse_class_spec(" , ")
+
+
+def test_compiled_spec_applies_per_class_thresholds_and_weights():
+    compiled = CompiledSpec(parse_class_spec("person:0.5:1,car:0.7:2,dog:0.5:0"), COCO_NAMES)
+    assert compiled.class_ids == [0, 2, 16]
+    assert compiled.min_confidence == 0.5
+
+    detections = Detections(np.zeros((5, 4)), [0.6, 0.4, 0.8, 0.6, 0.9], [0, 0, 2, 2, 16])
+    kept = compiled.apply(detections)
+    assert kept.classes.tolist() == [0, 2, 16]
+    assert compiled.detection_weights(kept).tolist() == [1.0, 2.0, 0.0]
+    assert compiled.threat_score(kept) == 3.0
+    assert compiled.class_counts(kept) == {"person": 1, "car": 1, "dog": 1}
+
+
+def test_compiled_spec_accepts_ids_and_rejects_unknown_names():
+    assert CompiledSpec(parse_class_spec("2"), COCO_NAMES).class_ids == [2]
+    with pytest.raises(ValueError):
+        CompiledSpec(parse_class_spec("tank"), COCO_NAMES)
+
+
+def test_assess_threat_levels():
+    assert [assess_threat(s) for s in (0, 0.5, 1, 2, 3, 3.5)] == [
+        "LOW", "MEDIUM", "MEDIUM", "HIGH", "HIGH", "CRITICAL"
+    ]
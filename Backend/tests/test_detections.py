@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from detections import Detections
+from stub_model import StubModel, _StubBoxes, _StubResult
+
+
+def test_from_result_reads_plain_and_tracked_layouts():
+    result = StubModel(num_boxes=2)(np.zeros((100, 200, 3), dtype=np.uint8), conf=0.0, classes=[0, 2])[0]
+    detections = Detections.from_result(result)
+    assert detections.boxes.tolist() == [[25.0, 30.0, 75.0, 90.0], [125.0, 30.0, 175.0, 90.0]]
+    assert detections.scores.tolist() == pytest.approx([0.95, 0.55])
+    assert detections.classes.tolist() == [0, 2]
+    assert detections.track_ids is None
+
+    # Tracker output: x1, y1, x2, y2, track_id, conf, cls
+    tracked = _StubResult(_StubBoxes(np.array([[1, 2, 3, 4, 7, 0.9, 0]], dtype=np.float32)), {})
+    tracked = Detections.from_result(tracked)
+    assert tracked.track_ids.tolist() == [7]
+    assert tracked.scores.tolist() == pytest.approx([0.9])
+    assert len(Detections.from_result(_StubResult(None, {}))) == 0
+
+
+def test_rescale_maps_resized_and_cropped_boxes_back():
+    detections = Detections([[10, 20, 30, 40]], [0.9], [0])
+    assert detections.rescale(0.5, 100, 50).boxes.tolist() == [[120.0, 90.0, 160.0, 130.0]]
+    assert detections.rescale() is detections
+
+
+def test_iou_matrix():
+    a = Detections([[0, 0, 10, 10], [20, 20, 30, 30]])
+    b = Detections([[5, 0, 15, 10]])
+    assert a.iou(b)[:, 0].tolist() == pytest.approx([1 / 3, 0.0])
+
+
+def test_nms_keeps_best_per_overlap_and_respects_classes():
+    detections = Detections(
+        [[0, 0, 10, 10], [1, 0, 11, 10], [0, 0, 10, 10], [50, 50, 60, 60]],
+        [0.6, 0.9, 0.8, 0.5],
+        [0, 0, 2, 0],
+    )
+    kept = detections.nms(0.5)
+    assert kept.scores.tolist() == pytest.approx([0.9, 0.8, 0.5])
+    assert kept.classes.tolist() == [0, 2, 0]
+
+    agnostic = detections.nms(0.5, class_aware=False)
+    assert agnostic.scores.tolist() == pytest.approx([0.9, 0.5])
+
+
+def test_merge_combines_passes_and_suppresses_duplicates():
+    coarse = Detections([[0, 0, 10, 20], [40, 40, 50, 60]], [0.4, 0.7], [0, 0])
+    refined = Detections([[0, 1, 10, 21]], [0.9], [0])
+    merged = Detections.merge([coarse, Detections.empty(), refined])
+    assert merged.boxes.tolist() == [[0.0, 1.0, 10.0, 21.0], [40.0, 40.0, 50.0, 60.0]]
+    assert len(Detections.merge([Detections.empty()])) == 0
+
+
+def test_filter_and_json_boundary():
+    detections = Detections([[0, 0, 1, 1], [2, 2, 3, 3]], [0.3, 0.8], [0, 2], track_ids=[5, 6])
+    kept = detections.filter(detections.scores > 0.5)
+    assert kept.to_json({0: "person", 2: "car"}) == {
+        "boxes": [[2.0, 2.0, 3.0, 3.0]], "count": 1, "confidences": [pytest.approx(0.8)],
+        "labels": ["car"], "track_ids": [6],
+    }
+    assert Detections.empty().to_json() == {"boxes": [], "count": 0, "confidences": []}
@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+
+import evidence
+from detections import Detections
+from evidence import EvidenceStore
+
+
+def frame(seed):
+    return np.random.default_rng(seed).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+
+
+def submit(store, stream_id, image, t, count=1, events=None):
+    _, jpeg = cv2.imencode(".jpg", image)
+    result = {"count": count, "detections": Detections([[1, 2, 30, 40]] * count, [0.9] * count, [0] * count)}
+    return store.submit(stream_id, image, jpeg, result, t, {"latitude": 1.0, "longitude": 2.0}, events)
+
+
+def test_rate_limit_keeps_event_frames(tmp_path):
+    store = EvidenceStore(root=tmp_path, min_interval=2.0)
+    store.open()
+    assert submit(store, "cam", frame(1), 100.0)
+    assert not submit(store, "cam", frame(2), 101.0)
+    # A frame that raised a threat event is kept inside the interval
+    assert submit(store, "cam", frame(3), 101.5, events=[{"event_id": "evt-1"}])
+    assert submit(store, "other", frame(4), 101.5)
+    assert submit(store, "cam", frame(5), 103.6)
+    store.close()
+    assert store.stored == 4 and store.rate_limited == 1
+    store.open()
+    records, _ = store.query(stream_id="cam")
+    assert [r["timestamp"] for r in records] == [103.6, 101.5, 100.0]
+    assert records[1]["event_ids"] == ["evt-1"]
+    store.close()
+
+
+def test_static_scene_is_deduplicated_unless_the_count_changes(tmp_path):
+    store = EvidenceStore(root=tmp_path, min_interval=0)
+    store.open()
+    scene = frame(1)
+    submit(store, "cam", scene, 100.0)
+    submit(store, "cam", scene, 110.0)
+    submit(store, "cam", scene, 120.0, count=2)
+    submit(store, "cam", frame(2), 130.0, count=2)
+    store.close()
+    assert store.deduplicated == 1 and store.stored == 3
+
+
+def test_keyset_pagination_and_filters(tmp_path):
+    store = EvidenceStore(root=tmp_path, min_interval=0)
+    store.open()
+    for i in range(5):
+        submit(store, "cam", frame(i), 100.0 + i)
+    submit(store, "other", frame(9), 102.5)
+    store.close()
+    store.open()
+
+    pages, cursor = [], None
+    while True:
+        records, cursor = store.query(stream_id="cam", before_id=cursor, limit=2)
+        pages.append([r["timestamp"] for r in records])
+        if cursor is None:
+            break
+    assert pages == [[104.0, 103.0], [102.0, 101.0], [100.0]]
+
+    records, cursor = store.query(since=102.0, until=104.0)
+    assert [(r["stream_id"], r["timestamp"]) for r in records] == [("other", 102.5), ("cam", 103.0), ("cam", 102.0)]
+    assert cursor is None
+
+    record = store.get(records[0]["id"])
+    assert record["gps_location"] == {"latitude": 1.0, "longitude": 2.0}
+    assert record["image_path"].is_file() and record["thumb_path"].is_file()
+    assert cv2.imread(str(record["thumb_path"])).shape[1] == store.thumb_width
+    assert store.get(999) is None
+    store.close()
+
+
+def test_store_is_opened_per_process(tmp_path, monkeypatch):
+    store = EvidenceStore(root=tmp_path, min_interval=0)
+    assert not submit(store, "cam", frame(1), 100.0)
+    assert store.query() == ([], None)
+
+    store.open()
+    writer, writer_queue = store._writer, store._queue
+    store.open()
+    assert store._writer is writer
+
+    # A forked worker inherits the object but not the writer thread
+    parent_pid = evidence.os.getpid()
+    monkeypatch.setattr(evidence.os, "getpid", lambda: parent_pid + 1)
+    assert not store.is_open
+    assert not submit(store, "cam", frame(1), 100.0)
+    store.open()
+    assert store.is_open and store._writer is not writer
+    assert submit(store, "cam", frame(1), 100.0)
+    store.close()
+    assert not store.is_open
+    assert store.stored == 1
+    # Stop the parent's writer too
+    writer_queue.put(None)
+    writer.join()
@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from logging_config import (
+    JsonFormatter, RateLimitedLogger, RequestContextFilter, StructuredQueueHandler, request_id_var
+)
+
+
+@pytest.fixture
+def captured():
+    """A logger wired like setup_logging: queue handler -> listener thread -> JSON lines"""
+    log_queue = queue.SimpleQueue()
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    output = io.StringIO()
+    stream_handler = logging.StreamHandler(output)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logger = logging.getLogger("guardx.test.logging")
+    logger.handlers, logger.propagate = [handler], False
+    logger.setLevel(logging.DEBUG)
+    listener.start()
+
+    def lines():
+        listener.stop()
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    yield logger, lines
+    logger.handlers = []
+
+
+def test_traceback_and_stack_are_separate_fields(captured):
+    logger, lines = captured
+    token = request_id_var.set("req-1")
+    try:
+        try:
+            raise ValueError("bad frame")
+        except ValueError:
+            logger.exception("❌ Failed %s", "detect", extra={"stream_id": "0"}, stack_info=True)
+    finally:
+        request_id_var.reset(token)
+
+    [entry] = lines()
+    assert entry["msg"] == "❌ Failed detect"
+    assert entry["level"] == "ERROR" and entry["request_id"] == "req-1" and entry["stream_id"] == "0"
+    assert entry["exc"].startswith("Traceback") and entry["exc"].endswith("ValueError: bad frame")
+    assert entry["stack"].startswith("Stack (most recent call last)")
+    assert "Traceback" not in entry["msg"]
+
+
+def test_rate_limited_logger_reports_suppressed_count(captured):
+    logger, lines = captured
+    frame_log = RateLimitedLogger(logger, interval=3600)
+    for frame in range(4):
+        frame_log.info("🎥 Streaming", extra={"frames": frame})
+    # Next interval: the record carries how many were dropped
+    frame_log._next_emit = 0.0
+    frame_log.warning("🎥 Streaming", extra={"frames": 4})
+    frame_log.debug("🎥 Streaming")
+
+    entries = lines()
+    assert [(e["frames"], e["suppressed"]) for e in entries] == [(0, 0), (4, 3)]
+    assert entries[1]["level"] == "WARNING"
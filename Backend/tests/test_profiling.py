@@ -0,0 +1,33 @@
+import threading
+import time
+
+import pytest
+
+import profiling
+
+
+def test_profiled_is_a_plain_call_without_a_capture():
+    assert profiling.profiled(lambda x, y=1: x + y, 2, y=3) == 5
+
+
+def test_torch_capture_records_operators_of_inference_on_other_threads():
+    torch = pytest.importorskip("torch")
+    model = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 8, 3), torch.nn.Flatten(), torch.nn.LazyLinear(4)
+    )
+    image = torch.rand(1, 3, 32, 32)
+    model(image)
+
+    result = {}
+    capture = threading.Thread(target=lambda: result.update(folded=profiling.profile_torch_ops(1)))
+    capture.start()
+    time.sleep(0.2)
+
+    # Inference on another worker thread, as the detect endpoint runs it
+    worker = threading.Thread(target=lambda: profiling.profiled(model, image))
+    worker.start()
+    worker.join()
+    capture.join()
+
+    assert "conv" in result["folded"]
+    assert "linear" in result["folded"]
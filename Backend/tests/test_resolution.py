@@ -0,0 +1,77 @@
+import asyncio
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from detections import Detections
+from model_wrapper import ModelWrapper
+from resolution import InferenceSpec, LatencyModel, refine_regions, resolve_imgsz
+from stub_model import StubModel
+
+
+def test_refine_regions_pads_merges_and_clips():
+    detections = Detections(
+        [[100, 100, 140, 200], [130, 120, 170, 220], [600, 400, 640, 480], [0, 0, 10, 10]],
+        [0.4, 0.35, 0.3, 0.9],
+    )
+    regions = refine_regions(detections, 640, 480, low=0.25, high=0.6, max_regions=8)
+    # The confident box is left alone; the two overlapping ones fold into one rectangle
+    assert regions == [(80, 50, 190, 270), (580, 360, 640, 480)]
+    assert refine_regions(detections, 640, 480, low=0.25, high=0.6, max_regions=1) == [(80, 50, 160, 250)]
+
+
+def test_refine_maps_crop_detections_back_to_the_source():
+    wrapper = ModelWrapper()
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    coarse = Detections([[100, 100, 140, 200]], [0.4], [0])
+
+    merged, regions = asyncio.run(wrapper._refine(
+        StubModel(num_boxes=1), image, coarse, 0.5, [0], InferenceSpec(refine=True), "detect"
+    ))
+
+    assert regions == 1
+    # The stub puts its box at fixed fractions of the 80x200 crop at (80, 50)
+    assert merged.boxes.tolist() == [[100.0, 110.0, 140.0, 230.0]]
+    assert merged.scores.tolist() == pytest.approx([0.95])
+
+
+def test_static_export_runs_in_its_batch_and_keeps_order():
+    wrapper = ModelWrapper()
+    wrapper.fixed_shape = (480, 4)
+    crops = [np.zeros((h, 100, 3), dtype=np.uint8) for h in (100, 200, 300, 400, 500)]
+    results = wrapper._forward(StubModel(num_boxes=1), crops, conf=0.5)
+    assert [Detections.from_result(r).boxes[0, 3] for r in results] == [90, 180, 270, 360, 450]
+    assert wrapper._resolve_imgsz(InferenceSpec(quality="max"), 640) == 480
+
+
+def test_latency_model_only_learns_standard_resolutions():
+    latency = LatencyModel()
+    assert latency.choose(0.01, default=640) == 640
+    latency.observe(224, 0.001)
+    assert latency.snapshot() == {}
+
+    latency.observe(320, 0.010)
+    # Unmeasured sizes scale with pixel area from the nearest measured one
+    assert latency.estimate(640) == pytest.approx(0.040)
+    assert latency.choose(0.045) == 640
+    assert latency.choose(0.001) == 320
+
+
+def test_resolve_imgsz_policies():
+    latency = LatencyModel()
+    latency.observe(640, 0.020)
+    assert resolve_imgsz(None, latency, 512) == 512
+    assert resolve_imgsz(InferenceSpec(quality="fast"), latency, 640) == 320
+    assert resolve_imgsz(InferenceSpec(latency_budget_ms=100), latency, 640) == 1280
+    # Refine keeps half of the budget for the second pass
+    assert resolve_imgsz(InferenceSpec(latency_budget_ms=50, refine=True), latency, 640) == 640
+
+
+def test_inference_spec_validation():
+    with pytest.raises(ValidationError):
+        InferenceSpec(quality="fast", latency_budget_ms=10)
+    with pytest.raises(ValidationError):
+        InferenceSpec(latency_budget_ms=0)
+    with pytest.raises(ValidationError):
+        InferenceSpec(quality="ultra")
@@ -0,0 +1,103 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from detections import Detections
+from responses import (
+    COMPACT_FIELDS, FastJSONResponse, build_compact_response, build_detect_response, encode_boxes, parse_fields
+)
+
+DETECTIONS = Detections([[10.04, 20.0, 30.0, 40.0], [1.0, 2.0, 3.0, 4.0]], [0.91234, 0.5], [0, 2])
+IMAGE = Image.new("RGB", (640, 480))
+USER = {"username": "field_operator", "unit": "SURVEILLANCE_OPERATIONS", "clearance_level": "SECRET"}
+
+
+def detection_result(detections=DETECTIONS):
+    return {
+        "detections": detections,
+        "count": len(detections),
+        "class_names": {0: "person", 2: "car"},
+        "class_counts": {"person": 1, "car": 1},
+        "threat_score": 1.5,
+        "model_type": "stub",
+        "processing_time": 0.0123,
+        "confidence_threshold": 0.5,
+        "imgsz": 640,
+        "refined_regions": 0,
+    }
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+    assert parse_fields(" n, boxes ,,scores") == ("n", "boxes", "scores")
+    with pytest.raises(ValueError, match="Unknown fields: bogus"):
+        parse_fields("n,bogus")
+
+
+def test_encode_boxes_nested_and_columnar():
+    boxes, scores = encode_boxes(DETECTIONS, "nested")
+    assert boxes == [[10.0, 20.0, 30.0, 40.0], [1.0, 2.0, 3.0, 4.0]]
+    assert scores == [0.9123, 0.5]
+
+    columns, scores = encode_boxes(DETECTIONS, "columnar")
+    assert columns == {"x1": [10.0, 1.0], "y1": [20.0, 2.0], "x2": [30.0, 3.0], "y2": [40.0, 4.0]}
+    assert scores == [0.9123, 0.5]
+
+
+def test_encode_boxes_binary_layout():
+    encoded, scores = encode_boxes(DETECTIONS, "binary")
+    assert scores is None
+    assert encoded["dtype"] == "<f4" and encoded["shape"] == [2, 5]
+    assert encoded["columns"] == ["x1", "y1", "x2", "y2", "score"]
+    table = np.frombuffer(base64.b64decode(encoded["data"]), dtype="<f4").reshape(encoded["shape"])
+    assert table[:, :4] == pytest.approx(DETECTIONS.boxes)
+    assert table[:, 4] == pytest.approx(DETECTIONS.scores)
+
+    empty, _ = encode_boxes(Detections.empty(), "binary")
+    assert empty["shape"] == [0, 5] and empty["data"] == ""
+
+
+def test_compact_response_fields():
+    full = build_compact_response(detection_result(), "HIGH", IMAGE)
+    assert tuple(full) == COMPACT_FIELDS
+    assert full["n"] == 2 and full["img"] == [640, 480] and full["ms"] == 12.3
+    assert full["cls"] == ["person", "car"]
+
+    # The version key is always kept; order follows the request
+    selected = build_compact_response(detection_result(), "HIGH", IMAGE, ("scores", "n"))
+    assert selected == {"v": 2, "scores": [0.9123, 0.5], "n": 2}
+    # Binary boxes carry their scores, so there is no separate scores key
+    binary = build_compact_response(detection_result(), "HIGH", IMAGE, ("n", "boxes", "scores"), "binary")
+    assert set(binary) == {"v", "n", "boxes"}
+
+
+def test_legacy_response_keeps_the_keys_the_frontend_reads():
+    response = build_detect_response("legacy", detection_result(), "HIGH", USER, IMAGE, "drone.jpg")
+    # apis/detectionApi.js: military shape first, old flat shape as fallback
+    detection = response["detection"]
+    assert detection["bounding_boxes"] == DETECTIONS.boxes_list()
+    assert detection["targets_identified"] == 2
+    assert detection["confidence_scores"] == DETECTIONS.scores_list()
+    for key in ("model_used", "processing_time", "threat_assessment"):
+        assert key in detection
+    assert response["image_metadata"]["dimensions"] == "640x480"
+    for key in ("timestamp", "operation_id", "operator"):
+        assert key in response
+    assert response["success"] is True
+    assert response["boxes"] == detection["bounding_boxes"]
+    assert response["count"] == 2
+    assert response["confidence_scores"] == detection["confidence_scores"]
+    assert response["image_size"] == {"width": 640, "height": 480}
+    assert response["model_used"] == "stub" and response["processing_time"] == 0.0123
+
+    military = build_detect_response("military", detection_result(), "HIGH", USER, IMAGE, "drone.jpg")
+    assert "boxes" not in military and military["detection"] == detection
+
+
+def test_fast_json_response_round_trips():
+    body = FastJSONResponse(content=build_compact_response(detection_result(), "HIGH", IMAGE)).body
+    assert json.loads(body)["boxes"][0] == [10.0, 20.0, 30.0, 40.0]
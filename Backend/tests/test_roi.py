@@ -0,0 +1,57 @@
+import asyncio
+
+import numpy as np
+
+from model_wrapper import ModelWrapper
+from roi import StreamROI, StreamROIConfig
+from stub_model import StubModel
+
+SQUARE = [[200, 100], [400, 100], [400, 300], [200, 300]]
+
+
+def stub_wrapper(num_boxes=1):
+    wrapper = ModelWrapper()
+    wrapper.models["stub"] = StubModel(num_boxes=num_boxes)
+    wrapper.active_model_name = "stub"
+    return wrapper
+
+
+def test_crop_rect_pads_and_clips_to_the_frame():
+    roi = StreamROI(StreamROIConfig(include=[SQUARE, [[600, 400], [650, 400], [650, 500]]], padding=16))
+    assert roi.crop_rect(640, 480) == (184, 84, 640, 480)
+    assert StreamROI(StreamROIConfig()).crop_rect(640, 480) == (0, 0, 640, 480)
+
+
+def test_keep_mask_uses_ground_point_include_and_exclude():
+    roi = StreamROI(StreamROIConfig(include=[SQUARE], exclude=[[[300, 250], [400, 250], [400, 300], [300, 300]]]))
+    boxes = [
+        [220, 150, 260, 280],  # inside
+        [320, 150, 360, 280],  # feet in the excluded corner
+        [220, 50, 260, 90],    # above the zone
+        [150, 200, 210, 350],  # overlaps, but stands outside
+    ]
+    assert roi.keep_mask(boxes).tolist() == [True, False, False, False]
+
+
+def test_stream_detections_map_back_to_full_frame_coordinates():
+    wrapper = stub_wrapper()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    roi = StreamROI(StreamROIConfig(include=[SQUARE], padding=0))
+
+    result = asyncio.run(wrapper.detect_realtime_frame(frame, roi))
+
+    # The stub box sits at fixed fractions of the 200x200 crop at (200, 100)
+    assert result["count"] == 1
+    assert result["detections"].boxes.tolist() == [[250.0, 160.0, 350.0, 280.0]]
+
+
+def test_stream_detections_outside_the_roi_are_dropped():
+    wrapper = stub_wrapper()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    # The crop keeps padding around the polygon, so the stub's box can land
+    # with its feet outside the polygon itself
+    roi = StreamROI(StreamROIConfig(include=[[[200, 100], [400, 100], [400, 150], [200, 150]]], padding=100))
+
+    result = asyncio.run(wrapper.detect_realtime_frame(frame, roi))
+
+    assert result["count"] == 0
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from telemetry import (
+    DETECTION_COLUMNS, TRACK_COLUMNS, TelemetryBuffer, TelemetryStore, decode_columns, encode_columns,
+    samples_to_array,
+)
+
+RTSP_STREAM = "rtsp://10.0.0.5:554/drone/front"
+
+
+def track(n, start=100.0, step=1.0):
+    return [{"t": start + i * step, "lat": 10 + i * 1e-4, "lon": 20 + i * 2e-4, "alt": 50 + i, "hdg": 90}
+            for i in range(n)]
+
+
+def test_samples_to_array_sorts_and_accepts_columns():
+    rows = samples_to_array([{"t": 2, "lat": 1, "lon": 2}, {"t": 1, "lat": 3, "lon": 4, "hdg": 370}])
+    assert rows.tolist() == [[1, 3, 4, 0, 10], [2, 1, 2, 0, 0]]
+    columns = samples_to_array({"lat": [1, 2], "lon": [3, 4]}, received_at=5.0)
+    assert columns[:, 0].tolist() == [5.0, 5.0]
+
+
+def test_position_is_interpolated_with_heading_on_the_short_arc():
+    buffer = TelemetryBuffer(8)
+    buffer.extend(samples_to_array([
+        {"t": 0, "lat": 10, "lon": 20, "alt": 100, "hdg": 350},
+        {"t": 1, "lat": 11, "lon": 22, "alt": 200, "hdg": 10},
+    ]))
+    row = buffer.position_at(0.25)
+    assert row[:4].tolist() == pytest.approx([0.25, 10.25, 20.5, 125])
+    assert row[4] == pytest.approx(355)
+
+
+def test_ring_wraps_rejects_stale_samples_and_matches_brute_force():
+    buffer = TelemetryBuffer(5)
+    rows = samples_to_array(track(12))
+    for chunk in np.array_split(rows, 4):
+        buffer.extend(chunk)
+    assert buffer.size == 5
+    assert buffer.ordered()[:, 0].tolist() == [107, 108, 109, 110, 111]
+    assert len(buffer.extend(rows[:3])) == 0 and buffer.rejected == 3
+
+    kept = buffer.ordered()
+    for t in np.linspace(107, 111, 17):
+        expected = [np.interp(t, kept[:, 0], kept[:, c]) for c in range(4)]
+        assert buffer.position_at(t)[:4].tolist() == pytest.approx(expected)
+
+
+def test_gaps_and_dropouts_give_no_invented_position():
+    buffer = TelemetryBuffer(8)
+    buffer.extend(samples_to_array([{"t": 0, "lat": 0, "lon": 0}, {"t": 20, "lat": 1, "lon": 1}]))
+    assert buffer.position_at(1, max_gap=2)[1] == 0  # nearest sample, not a line across the dropout
+    assert buffer.position_at(10, max_gap=2) is None
+    assert buffer.position_at(23, max_gap=2) is None
+    assert TelemetryBuffer(4).position_at(0) is None
+
+
+def test_encode_decode_round_trip_at_fixed_point_precision():
+    rows = samples_to_array(track(50))
+    rows[::7, 4] = [359.99, 0.01, 180, 0.5, 359.5, 90, 270, 1][: len(rows[::7])]
+    encoded = encode_columns(rows, TRACK_COLUMNS)
+    decoded = decode_columns(encoded, TRACK_COLUMNS)
+    assert decoded == pytest.approx(rows, abs=1e-6)
+    assert encoded["lat_delta"].dtype == np.int32
+    assert decode_columns(encode_columns(np.empty((0, 5)), TRACK_COLUMNS), TRACK_COLUMNS).shape == (0, 5)
+
+
+def test_sortie_round_trip_and_query_for_long_stream_ids(tmp_path):
+    store = TelemetryStore(root=tmp_path, capacity=100, max_gap=2)
+    sortie_ids = []
+    for _ in range(2):
+        store.start_sortie(RTSP_STREAM)
+        store.ingest(RTSP_STREAM, track(20))
+        store.record_detection(RTSP_STREAM, 105.5, store.position_at(RTSP_STREAM, 105.5), 2, 2.5)
+        sortie_ids.append(store.stop_sortie(RTSP_STREAM))
+
+    # Same stream and second: still two distinct, loadable sorties
+    assert len(set(sortie_ids)) == 2
+    assert [m["sortie_id"] for m in store.list_sorties()] == sorted(sortie_ids)
+    meta, rows, detections = store.load_sortie(sortie_ids[0])
+    assert meta["stream_id"] == RTSP_STREAM and meta["samples"] == 20
+    assert rows == pytest.approx(samples_to_array(track(20)), abs=1e-6)
+    assert detections.shape == (1, len(DETECTION_COLUMNS))
+    assert detections[0, 5:].tolist() == pytest.approx([2, 2.5])
+
+    results = store.query(bbox=[20.0009, 10.0004, 20.0013, 10.0007])
+    assert len(results) == 2
+    assert results[0]["spans"] == [[105.0, 106.0]]
+    assert len(results[0]["detections"]) == 1
+    assert store.query(since=1000) == []
+
+
+def test_unknown_or_unsafe_sortie_ids_are_not_found(tmp_path):
+    store = TelemetryStore(root=tmp_path)
+    assert store.load_sortie("../index") is None
+    assert store.load_sortie("missing") is None
+    assert store.stop_sortie("never-started") is None
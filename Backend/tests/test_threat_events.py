@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from detections import Detections
+from geometry import as_polygon, box_anchor_points, points_in_any, points_in_polygon
+from threat_events import GpsLocation, ThreatEventEngine, ZoneConfig
+
+SQUARE = [[0, 0], [100, 0], [100, 100], [0, 100]]
+
+
+def frame(*boxes, weights=None):
+    detections = Detections(boxes or np.zeros((0, 4)), [0.9] * len(boxes), [0] * len(boxes))
+    result = {"detections": detections, "count": len(detections)}
+    if weights is not None:
+        result["weights"] = np.asarray(weights, dtype=np.float32)
+    return result
+
+
+def test_points_in_polygon_concave_and_outside():
+    # U shape: the notch between the arms is outside
+    u_shape = as_polygon([[0, 0], [30, 0], [30, 30], [20, 30], [20, 10], [10, 10], [10, 30], [0, 30]])
+    points = [[5, 20], [15, 20], [25, 20], [15, 5], [40, 5], [-1, 5]]
+    assert points_in_polygon(points, u_shape).tolist() == [True, False, True, True, False, False]
+    assert points_in_polygon(np.zeros((0, 2)), u_shape).tolist() == []
+
+
+def test_points_in_any_and_anchor_points():
+    polygons = [as_polygon(SQUARE), as_polygon([[200, 200], [300, 200], [250, 300]])]
+    assert points_in_any([[50, 50], [250, 250], [150, 150]], polygons).tolist() == [True, True, False]
+    assert box_anchor_points([[10, 20, 30, 60]]).tolist() == [[20.0, 60.0]]
+
+
+def test_as_polygon_needs_three_vertices():
+    with pytest.raises(ValueError):
+        as_polygon([[0, 0], [1, 1]])
+
+
+def test_zone_entered_and_cleared_are_debounced():
+    engine = ThreatEventEngine(debounce_frames=2, clear_frames=2, cooldown_seconds=0)
+    engine.set_zone(ZoneConfig(zone_id="gate", polygon=SQUARE))
+    inside = [10, 10, 30, 50]
+
+    assert engine.process("cam", frame(inside), 1.0) == []
+    assert [e["event"] for e in engine.process("cam", frame(inside), 2.0)] == ["zone_entered"]
+    assert engine.process("cam", frame(), 3.0) == []
+    cleared = engine.process("cam", frame(), 4.0)
+    assert [e["event"] for e in cleared] == ["zone_cleared"]
+    assert cleared[0]["occupied_seconds"] == 2.0
+
+
+def test_anchor_outside_zone_does_not_enter():
+    engine = ThreatEventEngine(debounce_frames=1)
+    engine.set_zone(ZoneConfig(zone_id="gate", polygon=SQUARE))
+    # Box overlaps the zone but the person stands below it
+    assert engine.process("cam", frame([10, 50, 30, 150]), 1.0) == []
+
+
+def test_dwell_and_count_exceeded():
+    engine = ThreatEventEngine(debounce_frames=1, cooldown_seconds=0)
+    engine.set_zone(ZoneConfig(zone_id="yard", dwell_seconds=5, max_count=1))
+    two = frame([0, 0, 10, 10], [20, 20, 30, 30])
+
+    assert [e["event"] for e in engine.process("cam", two, 0.0)] == ["zone_entered", "count_exceeded"]
+    assert engine.process("cam", two, 3.0) == []
+    assert [e["event"] for e in engine.process("cam", two, 6.0)] == ["dwell_exceeded"]
+
+
+def test_zero_weight_classes_never_occupy_a_zone():
+    engine = ThreatEventEngine(debounce_frames=1)
+    engine.set_zone(ZoneConfig(zone_id="yard"))
+    assert engine.process("cam", frame([0, 0, 10, 10], weights=[0.0]), 1.0) == []
+    events = engine.process("cam", frame([0, 0, 10, 10], [5, 5, 9, 9], weights=[0.0, 2.0]), 2.0)
+    assert [(e["event"], e["count"], e["threat_score"]) for e in events] == [("zone_entered", 1, 2.0)]
+
+
+def test_cooldown_keeps_enter_and_clear_paired():
+    engine = ThreatEventEngine(debounce_frames=1, clear_frames=1, cooldown_seconds=10)
+    engine.set_zone(ZoneConfig(zone_id="yard"))
+    person = [0, 0, 10, 10]
+    emitted = []
+    for t, boxes in enumerate([[person], [], [person], [], [], [person]]):
+        emitted += [e["event"] for e in engine.process("cam", frame(*boxes), float(t))]
+    # The second entry falls in the cooldown, so neither it nor its exit is reported
+    assert emitted == ["zone_entered", "zone_cleared"]
+
+    later = engine.process("cam", frame(person), 20.0)
+    assert [e["event"] for e in later] == ["zone_entered"]
+
+
+def test_gps_zone_uses_frame_position():
+    engine = ThreatEventEngine(debounce_frames=1)
+    engine.set_zone(ZoneConfig(zone_id="area", coords="gps", polygon=[[10, 10], [11, 10], [11, 11], [10, 11]]))
+    person = frame([0, 0, 10, 10])
+    assert engine.process("cam", person, 1.0, {"latitude": 20.0, "longitude": 20.0}) == []
+    assert engine.process("cam", person, 2.0, None) == []
+    events = engine.process("cam", person, 3.0, {"latitude": 10.5, "longitude": 10.5})
+    assert [e["event"] for e in events] == ["zone_entered"]
+
+
+def test_gps_location_is_validated():
+    assert GpsLocation.model_validate({"latitude": 1, "longitude": 2}).latitude == 1.0
+    with pytest.raises(ValidationError):
+        GpsLocation.model_validate({"latitude": 1})
+    with pytest.raises(ValidationError):
+        GpsLocation.model_validate({"latitude": 91, "longitude": 0})
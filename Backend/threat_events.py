@@ -0,0 +1,248 @@
+"""
+Server-side threat event engine.
+
+Turns the per-frame detection stream into debounced, deduplicated events
+(zone entered, dwell time exceeded, count over threshold, zone cleared).
+Alert consumers subscribe to events instead of receiving every frame.
+
+Zones are polygons in pixel coordinates for one camera stream, or in
+longitude/latitude for a GPS area. Pixel zones are tested against each
+detection's ground point; GPS zones are tested against the frame's position.
+
+Occupancy is weighted by the stream's class spec: a person counts 1 by
+default, and classes with weight 0 never enter a zone or count toward
+``max_count``.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field, field_validator
+
+from geometry import as_polygon, points_in_polygon, box_anchor_points
+
+logger = logging.getLogger("guardx.events")
+
+
+class GpsLocation(BaseModel):
+    """A client-supplied position; validated before it reaches the stream loop"""
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    altitude: Optional[float] = None
+    heading: Optional[float] = None
+
+
+class ZoneConfig(BaseModel):
+    zone_id: str
+    name: str = ""
+    # Vertices as [x, y] pixels, or [longitude, latitude] when coords == "gps".
+    # Omit for the whole frame.
+    polygon: Optional[List[List[float]]] = None
+    coords: str = Field("pixel", pattern="^(pixel|gps)$")
+    stream_id: Optional[str] = None  # None applies to every stream
+    max_count: Optional[float] = None  # against the weighted occupancy
+    dwell_seconds: Optional[float] = None
+    severity: str = "HIGH"
+
+    @field_validator("polygon")
+    @classmethod
+    def check_polygon(cls, value):
+        if value is not None:
+            as_polygon(value)
+        return value
+
+
+class _Zone:
+    """A configured zone with its polygon pre-converted for vectorized tests"""
+
+    def __init__(self, config: ZoneConfig):
+        self.config = config
+        self.polygon = as_polygon(config.polygon) if config.polygon else None
+
+    def applies_to(self, stream_id):
+        return self.config.stream_id is None or self.config.stream_id == stream_id
+
+    def occupancy(self, anchors, weights, gps_point):
+        """(detections inside the zone, their summed threat weight); weight-0 classes are ignored"""
+        if self.polygon is None:
+            inside = weights > 0
+        elif self.config.coords == "gps":
+            if gps_point is None or not points_in_polygon(gps_point, self.polygon)[0]:
+                return 0, 0.0
+            inside = weights > 0
+        else:
+            inside = points_in_polygon(anchors, self.polygon) & (weights > 0)
+        return int(np.count_nonzero(inside)), float(weights[inside].sum())
+
+
+class _ZoneState:
+    """Debounce state for one (stream, zone) pair"""
+
+    def __init__(self):
+        self.occupied = False
+        self.occupied_since = None
+        self.dwell_reported = False
+        self.over_count = False
+        self.hits = 0
+        self.misses = 0
+        self.over_hits = 0
+        self.over_misses = 0
+
+
+class ThreatEventEngine:
+    def __init__(self, debounce_frames=2, clear_frames=5, cooldown_seconds=30.0, history=500):
+        # Frames in a row a condition must hold before it is reported
+        self.debounce_frames = debounce_frames
+        self.clear_frames = clear_frames
+        # Identical events for the same zone are suppressed for this long
+        self.cooldown_seconds = cooldown_seconds
+
+        self.zones = {}
+        self._states = {}
+        self._last_emitted = {}
+        self._event_ids = itertools.count(1)
+        self.recent_events = deque(maxlen=history)
+        self._subscribers = {}
+
+    # Zone configuration
+
+    def set_zone(self, config: ZoneConfig):
+        self.zones[config.zone_id] = _Zone(config)
+        # Restart debouncing for the zone under its new geometry
+        self._states = {k: v for k, v in self._states.items() if k[1] != config.zone_id}
+        logger.info(f"🗺️  Zone configured: {config.zone_id}", extra={"stream_id": config.stream_id, "coords": config.coords})
+
+    def remove_zone(self, zone_id):
+        removed = self.zones.pop(zone_id, None)
+        self._states = {k: v for k, v in self._states.items() if k[1] != zone_id}
+        return removed is not None
+
+    def list_zones(self):
+        return [zone.config.model_dump() for zone in self.zones.values()]
+
+    # Subscriptions
+
+    def subscribe(self, stream_id=None, max_pending=100):
+        """Queue that receives events (optionally for one stream only)"""
+        queue = asyncio.Queue(maxsize=max_pending)
+        self._subscribers[queue] = stream_id
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.pop(queue, None)
+
+    def _publish(self, event):
+        self.recent_events.append(event)
+        for queue, stream_filter in list(self._subscribers.items()):
+            if stream_filter is not None and stream_filter != event["stream_id"]:
+                continue
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block the stream
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    # Frame processing
+
+    def _emit(self, events, event_type, zone, stream_id, count, score, timestamp, gps_location, **details):
+        """Emit unless in cooldown; returns whether the event went out"""
+        key = (stream_id, zone.config.zone_id, event_type)
+        last = self._last_emitted.get(key)
+        if last is not None and timestamp - last < self.cooldown_seconds:
+            return False
+        self._last_emitted[key] = timestamp
+        event = {
+            "type": "threat_event",
+            "event_id": next(self._event_ids),
+            "event": event_type,
+            "stream_id": stream_id,
+            "zone_id": zone.config.zone_id,
+            "zone_name": zone.config.name or zone.config.zone_id,
+            "severity": zone.config.severity,
+            "count": count,
+            "threat_score": round(score, 3),
+            "timestamp": timestamp,
+            "gps_location": gps_location,
+            **details,
+        }
+        events.append(event)
+        self._publish(event)
+        return True
+
+    def process(self, stream_id, detection_result, timestamp=None, gps_location=None):
+        """Feed one detected frame; returns the events it triggered"""
+        if not self.zones:
+            return []
+        timestamp = timestamp if timestamp is not None else time.time()
+        detections = detection_result["detections"]
+        anchors = box_anchor_points(detections.boxes)
+        weights = detection_result.get("weights")
+        if weights is None:
+            weights = np.ones(len(detections), dtype=np.float32)
+        gps_point = None
+        if gps_location:
+            gps_point = np.array([[gps_location["longitude"], gps_location["latitude"]]])
+
+        events = []
+        for zone in self.zones.values():
+            if not zone.applies_to(stream_id):
+                continue
+            state = self._states.setdefault((stream_id, zone.config.zone_id), _ZoneState())
+            count, score = zone.occupancy(anchors, weights, gps_point)
+            emit = lambda event_type, **details: self._emit(
+                events, event_type, zone, stream_id, count, score, timestamp, gps_location, **details
+            )
+
+            # Occupancy with hysteresis. State only flips when its event is
+            # emitted, so a cooldown never leaves a cleared without an entered.
+            if score > 0:
+                state.hits += 1
+                state.misses = 0
+                if not state.occupied and state.hits >= self.debounce_frames and emit("zone_entered"):
+                    state.occupied = True
+                    state.occupied_since = timestamp
+                    state.dwell_reported = False
+            else:
+                state.misses += 1
+                state.hits = 0
+                if state.occupied and state.misses >= self.clear_frames and emit(
+                    "zone_cleared", occupied_seconds=round(timestamp - state.occupied_since, 1)
+                ):
+                    state.occupied = False
+                    state.occupied_since = None
+
+            dwell = zone.config.dwell_seconds
+            if state.occupied and dwell is not None and not state.dwell_reported:
+                if timestamp - state.occupied_since >= dwell:
+                    state.dwell_reported = emit("dwell_exceeded", dwell_seconds=round(timestamp - state.occupied_since, 1))
+
+            max_count = zone.config.max_count
+            if max_count is not None:
+                if score > max_count:
+                    state.over_hits += 1
+                    state.over_misses = 0
+                    if not state.over_count and state.over_hits >= self.debounce_frames:
+                        state.over_count = emit("count_exceeded", max_count=max_count)
+                else:
+                    state.over_misses += 1
+                    state.over_hits = 0
+                    if state.over_count and state.over_misses >= self.clear_frames:
+                        state.over_count = False
+
+        return events
+
+    def reset_stream(self, stream_id):
+        """Forget debounce state when a stream stops"""
+        self._states = {k: v for k, v in self._states.items() if k[0] != stream_id}
+
+    def get_recent_events(self, limit=50, stream_id=None):
+        events = [e for e in self.recent_events if stream_id is None or e["stream_id"] == stream_id]
+        return events[-limit:][::-1]
+
+
+# Global event engine shared by all streams
+threat_engine = ThreatEventEngine()
@@ -1,24 +1,29 @@
-from ultralytics import YOLO
+from stub_model import STUB_MODEL_ENABLED, StubModel
+from detections import Detections
 import cv2
 import numpy as np
 
+try:
+    from ultralytics import YOLO
+except ImportError:
+    if not STUB_MODEL_ENABLED:
+        raise
+    YOLO = None
+
 class YOLOHumanDetector:
     def __init__(self, model_path='yolov8n.pt'):
-        self.model = YOLO(model_path)
-        
+        self.model = StubModel() if STUB_MODEL_ENABLED else YOLO(model_path)
+
     def detect_humans(self, image_path):
-        # Run inference
-        results = self.model(image_path)
-        
-        boxes = []
-        for result in results:
-            for box in result.boxes:
-                # Check if detected class is 'person' (class 0 in COCO)
-                if int(box.cls) == 0:  # Person class
-                    confidence = float(box.conf)
-                    if confidence > 0.5:  # Confidence threshold
-                        # Get bounding box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        boxes.append([int(x1), int(y1), int(x2), int(y2)])
-        
-        return boxes
\ No newline at end of file
+        # Person class is filtered inside the model call; keep the strict
+        # confidence threshold this method has always used
+        result = self.detect_humans_batch([image_path], conf=0.5)[0]
+        result = result.filter(result.scores > 0.5)
+        return result.boxes.astype(int).tolist()
+
+    def detect_humans_batch(self, images, conf=0.5, imgsz=None):
+        """One forward pass over a list of images (paths or BGR arrays); one Detections per image"""
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        # class 0 = person (COCO)
+        results = self.model(images, conf=conf, classes=[0], verbose=False, **kwargs)
+        return [Detections.from_result(result) for result in results]